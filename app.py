@@ -12,36 +12,46 @@ import sqlite3
 import json
 import os
 import time
-from datetime import datetime
-from threading import Thread, Lock
+import queue
+import itertools
+import functools
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import Thread, Lock, Event
 import base64
+import struct
+import socket
 
-# AI Vision imports - Google ViT Model
+# Fast JSON encoding for API responses (falls back to Flask's encoder if missing)
 try:
-    from PIL import Image
-    import numpy as np
-    from transformers import pipeline
-    import torch
-    AI_AVAILABLE = True
-    AI_MODE = "FULL"
-    print("✅ Google ViT AI Vision model enabled (FULL mode with transformers)")
-except ImportError as e:
-    print(f"⚠️ FullAI modules not available: {e}")
-    try:
-        from PIL import Image
-        import numpy as np
-        AI_AVAILABLE = True
-        AI_MODE = "BASIC"
-        print("⚠️ Fallback to Basic AI Vision mode (PIL + image analysis)")
-    except ImportError as e2:
-        print(f"❌ No AI modules available: {e2}")
-        AI_AVAILABLE = False
-        AI_MODE = "NONE"
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("⚠️ orjson not available, using standard JSON encoder")
+
+# AI Vision (Google ViT with basic PIL fallback) lives in app_ai.py; nothing here
+# calls it while background analysis is disabled, so the server doesn't import it
 
 # ================= STEP COUNTER STATE =================
 from collections import deque
 step_counter_lock = Lock()
 step_count_global = 0  # Total steps counted
+daily_step_totals = {}  # device_id -> (date, steps today), mirrors today's step_statistics row
+
+# Change counters behind the step-counter ETags (next() on itertools.count is atomic)
+step_counter_versions = itertools.count(1)
+step_counter_version = 0  # step_count_global or a daily step total changed
+step_stats_versions = itertools.count(1)
+step_stats_version = 0  # step_statistics or sensor_readings changed
+
+def bump_step_counter_version():
+    global step_counter_version
+    step_counter_version = next(step_counter_versions)
+
+def bump_step_stats_version():
+    global step_stats_version
+    step_stats_version = next(step_stats_versions)
 accel_history = deque(maxlen=20)  # Keep last 20 acceleration readings (enough for 2-second span @ 100ms intervals)
 last_step_time = 0  # Prevent duplicate step detection
 
@@ -78,20 +88,73 @@ def detect_steps(accel_x, accel_y, accel_z, current_time):
         detect_steps.last_step_time = current_time
         with step_counter_lock:
             step_count_global += 1
+        bump_step_counter_version()
         print(f'     ✅👣 STEP #{step_count_global}! stoss: {stoss:.0f} > barrier: {barrier} | interval: {time_since_last_step:.2f}s')
     return steps_detected
 
 # ================= CREATE FLASK APP =================
 app = Flask(__name__, static_folder='.', static_url_path='')
 
+if ORJSON_AVAILABLE:
+    from flask.json.provider import DefaultJSONProvider
+    
+    class ORJSONProvider(DefaultJSONProvider):
+        """jsonify()/get_json() through orjson, same output as Flask's default provider
+        
+        Keys stay sorted, and datetimes plus any type orjson doesn't know go through
+        Flask's default() so responses are unchanged.
+        """
+        OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+    
+    app.json = ORJSONProvider(app)
+
 # ================= BUFFER CONFIGURATION =================
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max request size
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching
 
 # Add stability configurations
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 logging.basicConfig(level=logging.ERROR)  # Reduce logging noise
 app.logger.setLevel(logging.ERROR)
+# Module logger: INFO for app events, DEBUG for per-poll chatter (off by default)
+# Set LOG_LEVEL=WARNING in production to skip INFO formatting entirely
+logger = logging.getLogger(__name__)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# getLevelName() returns the number for a known level name (getLevelNamesMapping() is 3.11+)
+log_level_valid = isinstance(logging.getLevelName(LOG_LEVEL), int)
+logger.setLevel(LOG_LEVEL if log_level_valid else logging.INFO)
+# Request threads only enqueue records; a listener thread does the stream writes
+log_queue = queue.Queue(-1)
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+log_listener = QueueListener(log_queue, log_stream_handler)
+logger.addHandler(QueueHandler(log_queue))
+logger.propagate = False
+log_listener.start()
+atexit.register(log_listener.stop)
+if not log_level_valid:
+    logger.warning('Unknown LOG_LEVEL %r, using INFO', LOG_LEVEL)
+
+# Polled responses only need second resolution, so format the timestamp once per second
+iso_now_cache = (0, '')  # (epoch second, local ISO string); swapped as one tuple
+
+def iso_now_seconds():
+    """Local ISO timestamp truncated to the second, reused within the same second"""
+    global iso_now_cache
+    now = int(time.time())
+    cached_second, cached_text = iso_now_cache
+    if now != cached_second:
+        cached_text = datetime.fromtimestamp(now).isoformat()
+        iso_now_cache = (now, cached_text)
+    return cached_text
 
 CORS(app)
 socketio = SocketIO(app, 
@@ -119,26 +182,6 @@ def add_performance_headers(response):
 DB_PATH = 'sensor_data.db'
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
 
-# AI Configuration
-if AI_AVAILABLE:
-    CACHE_DIR = r"E:\Rajeev\esp 32\esp 32\.cache\huggingface"
-    os.environ['HUGGINGFACE_HUB_CACHE'] = CACHE_DIR
-    os.makedirs(CACHE_DIR, exist_ok=True)
-    
-    # Determine device: GPU if available, otherwise CPU
-    try:
-        AI_DEVICE = 0 if torch.cuda.is_available() else -1
-        if torch.cuda.is_available():
-            print(f"✅ GPU available: {torch.cuda.get_device_name(0)}")
-        else:
-            print("⚠️ GPU not available, using CPU for AI analysis")
-    except:
-        AI_DEVICE = -1
-        print("⚠️ Using CPU for AI analysis")
-    
-    # Initialize AI model (lazy loading)
-    ai_classifier = None
-
 # ================= ORIENTATION DETECTION (Server-side) =================
 def detect_device_orientation(ax, ay, az):
     """
@@ -191,132 +234,13 @@ def detect_device_orientation(ax, ay, az):
         print(f"❌ Error in orientation detection: {e}")
         return "UNKNOWN", 0.0
 
-# AI Analysis Function with fallback
-def analyze_image_with_ai(image_path):
-    """Analyze image using AI models or basic image analysis as fallback"""
-    global ai_classifier
-    
-    if not AI_AVAILABLE:
-        return "AI analysis not available - missing dependencies"
-    
-    try:
-        if AI_MODE == "FULL":
-            # Full AI Model Analysis (Google ViT)
-            if ai_classifier is None:
-                print("Loading Google ViT vision model...")
-                ai_classifier = pipeline(
-                    "image-classification",
-                    model="google/vit-base-patch16-224",
-                    device=AI_DEVICE
-                )
-                print("Google ViT model loaded successfully")
-            
-            # Load and analyze image
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Get AI predictions
-            results = ai_classifier(image, top_k=5)
-            
-            # Generate natural caption 
-            top_result = results[0]
-            confidence = top_result['score'] * 100
-            main_label = top_result['label']
-            
-            # Check for people-related content
-            people_keywords = ['people', 'person', 'group', 'crowd', 'team', 'family', 'human', 'face', 'portrait']
-            people_detected = any(keyword in result['label'].lower() for result in results for keyword in people_keywords)
-            
-            # Generate natural, descriptive caption
-            if people_detected:
-                caption = f"This image shows a group of people (detected with {confidence:.1f}% confidence)"
-            else:
-                main_label_clean = main_label.replace('_', ' ').replace('-', ' ')
-                caption = f"This image shows {main_label_clean} (detected with {confidence:.1f}% confidence)"
-            
-            return caption
-            
-        elif AI_MODE == "BASIC":
-            # Basic Image Analysis (PIL + Visual Features)
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Get image properties
-            width, height = image.size
-            img_array = np.array(image)
-            
-            # Basic color analysis
-            mean_colors = np.mean(img_array, axis=(0, 1))
-            color_variance = np.var(img_array.reshape(-1, 3), axis=0)
-            total_variance = np.sum(color_variance)
-            brightness = np.mean(img_array)
-            
-            # Basic feature detection
-            aspect_ratio = width / height
-            
-            # Generate descriptive caption based on visual features
-            caption_parts = []
-            
-            # Resolution description
-            if width * height > 100000:
-                caption_parts.append("high-resolution")
-            else:
-                caption_parts.append("compact")
-            
-            # Color description
-            if brightness > 200:
-                caption_parts.append("bright")
-            elif brightness < 80:
-                caption_parts.append("dark")
-            else:
-                caption_parts.append("well-lit")
-            
-            # Orientation
-            if aspect_ratio > 1.5:
-                caption_parts.append("landscape-oriented")
-            elif aspect_ratio < 0.7:
-                caption_parts.append("portrait-oriented")
-            else:
-                caption_parts.append("square-oriented")
-            
-            # Color richness
-            if total_variance > 8000:
-                caption_parts.append("colorful scene")
-            elif total_variance > 3000:
-                caption_parts.append("moderately colorful image")
-            else:
-                caption_parts.append("simple colored image")
-            
-            # Dominant color
-            r, g, b = mean_colors
-            if r > g and r > b:
-                caption_parts.append("with reddish tones")
-            elif g > r and g > b:
-                caption_parts.append("with greenish tones")
-            elif b > r and b > g:
-                caption_parts.append("with bluish tones")
-            
-            caption = f"This is a {' '.join(caption_parts[:4])} captured from ESP32 camera"
-            
-            # Add technical details
-            caption += f" (Resolution: {width}×{height}, Brightness: {brightness:.0f}/255)"
-            
-            return caption
-    
-    except Exception as e:
-        print(f"AI Analysis error: {e}")
-        import traceback
-        traceback.print_exc()
-        return f"Image analysis failed: {str(e)[:100]}..."
-
 # ❌ DISABLED: Background AI analysis (file-based, not compatible with database-only storage)
 # ================= BACKGROUND AI ANALYSIS (NON-BLOCKING) =================
 # def analyze_and_store_image(filepath, filename):
 #     """Background task: Run AI analysis and store result without blocking server"""
 #     try:
 #         print(f"🤖 [BACKGROUND] Starting AI analysis for {filename}...")
+#         from app_ai import analyze_image_with_ai
 #         ai_caption = analyze_image_with_ai(filepath)
 #         
 #         # Store in database
@@ -394,9 +318,9 @@ def broadcast_camera_update(image_id=None, ai_caption=None, timestamp=None):
     
     socketio.start_background_task(emit_update)
 
-def broadcast_step_counter_update(total_steps, daily_steps=0):
+def broadcast_step_counter_update(total_steps, daily_steps=0, device_id='ESP32_001'):
     """
-    Broadcast step counter update event to all connected WebSocket clients
+    Broadcast step counter update event to the device's room
     Uses a background task to ensure proper context for emission
     """
     def emit_update():
@@ -404,10 +328,10 @@ def broadcast_step_counter_update(total_steps, daily_steps=0):
             socketio.emit('step_counter_updated', {
                 'total_steps': total_steps,
                 'daily_steps': daily_steps,
-                'timestamp': datetime.now().isoformat(),
-                'device_id': 'ESP32_001'
-            })
-            print(f"👟 Broadcasted step update: {total_steps} steps to all connected clients")
+                'timestamp': iso_now_seconds(),
+                'device_id': device_id
+            }, to=device_id)
+            logger.debug('Broadcasted step update: %s steps to the %s room', total_steps, device_id)
     
     socketio.start_background_task(emit_update)
 
@@ -442,6 +366,113 @@ def get_db_connection():
         print(f"Database connection error: {e}")
         return None
 
+# Pool of pre-opened connections for the request handlers (pragmas applied once per connection)
+DB_POOL_SIZE = 8
+db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+def open_pooled_connection():
+    """Open a tuned connection that may be shared across request threads"""
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None, check_same_thread=False,
+                           cached_statements=256)
+    conn.row_factory = sqlite3.Row  # columns by name; JSON-ready values are shaped in SQL
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    conn.execute("PRAGMA wal_autocheckpoint=1000;")  # bounded WAL so checkpoints stay short
+    conn.execute("PRAGMA cache_size=-20000;")
+    conn.execute("PRAGMA temp_store=memory;")
+    return conn
+
+@contextmanager
+def pooled_db_connection():
+    """Borrow a connection from the pool (yields None if the database can't be opened)
+    
+    WAL mode lets readers run alongside the writer, so pure SELECTs don't need db_lock.
+    """
+    try:
+        conn = db_pool.get_nowait()
+    except queue.Empty:
+        try:
+            conn = open_pooled_connection()
+        except sqlite3.Error as e:
+            print(f"Database connection error: {e}")
+            conn = None
+    
+    try:
+        yield conn
+    finally:
+        if conn:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                db_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+# SQL run on pooled connections, kept as constants so each statement has a single text
+# for the per-connection statement cache
+
+# Today's step_statistics total for one device
+DAILY_STEPS_SQL = '''
+    SELECT total_steps FROM step_statistics
+    WHERE device_id = ? AND date_recorded = ?
+'''
+
+# Store the selected menu for one device
+UPDATE_MENU_SQL = '''
+    UPDATE pet_state
+    SET current_menu = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE device_id = ?
+'''
+
+# get_step_stats: daily rows with the summary and weekly trend aggregates on each row
+STEP_STATS_SQL = '''
+    WITH daily AS (
+        SELECT 
+            date_recorded,
+            total_steps,
+            peak_steps,
+            ROUND(avg_step_interval, 2) AS avg_step_interval,
+            activity_level,
+            updated_at
+        FROM step_statistics
+        WHERE device_id = ? AND date_recorded >= ?
+    ),
+    summary AS (
+        SELECT 
+            COUNT(*) AS days_tracked,
+            COALESCE(ROUND(AVG(total_steps), 1), 0) AS avg_daily_steps,
+            COALESCE(MAX(total_steps), 0) AS max_daily_steps
+        FROM daily
+    ),
+    weeks AS (
+        SELECT 
+            SUM(CASE WHEN date_recorded >= ? THEN 1 ELSE 0 END) AS week_days,
+            SUM(CASE WHEN date_recorded >= ? THEN total_steps ELSE 0 END) AS last_week,
+            SUM(CASE WHEN date_recorded < ? THEN total_steps ELSE 0 END) AS prev_week
+        FROM step_statistics
+        WHERE device_id = ? AND date_recorded >= ?
+    )
+    SELECT daily.*, summary.*, weeks.*
+    FROM summary CROSS JOIN weeks LEFT JOIN daily ON 1
+    ORDER BY daily.date_recorded DESC
+'''
+
+# get_step_stats: latest step batches in a half-open time range
+TODAY_BATCHES_SQL = '''
+    SELECT 
+        timestamp,
+        step_count,
+        ROUND(accel_x, 3) AS accel_x,
+        ROUND(accel_y, 3) AS accel_y,
+        ROUND(accel_z, 3) AS accel_z,
+        SUM(step_count) OVER (ORDER BY timestamp) as cumulative_steps
+    FROM sensor_readings
+    WHERE device_id = ? AND timestamp >= ? AND timestamp < ?
+    ORDER BY timestamp DESC
+    LIMIT 20
+'''
+
 # Initialize database
 def init_database():
     """Initialize database with proper error handling"""
@@ -561,6 +592,9 @@ def init_database():
             
             print("✅ Created step_statistics table")            
             
+            # Point lookups of one device's day (step counter poll, stats window)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_step_statistics_device_date ON step_statistics(device_id, date_recorded)')
+            
             # Add device_id column if it doesn't exist (for existing databases)
             cursor.execute("PRAGMA table_info(sensor_readings)")
             columns = [column[1] for column in cursor.fetchall()]
@@ -568,6 +602,9 @@ def init_database():
                 cursor.execute("ALTER TABLE sensor_readings ADD COLUMN device_id TEXT DEFAULT 'ESP32_001'")
                 print("✅ Added device_id column to existing sensor_readings table")
             
+            # Range scans of one device's readings by time (today's batches, newest first)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sensor_readings_device_timestamp ON sensor_readings(device_id, timestamp)')
+            
             # Create important_events table for ESP32 event polling
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS important_events (
@@ -621,6 +658,16 @@ def init_database():
             except Exception as e:
                 print(f"⚠️ Migration warning: {e}")
             
+            # ===== DATABASE MIGRATION: One oled_display_state row per device (enables UPSERT) =====
+            try:
+                cursor.execute('''
+                    DELETE FROM oled_display_state
+                    WHERE id NOT IN (SELECT MAX(id) FROM oled_display_state GROUP BY device_id)
+                ''')
+                cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_oled_display_state_device ON oled_display_state(device_id)')
+            except Exception as e:
+                print(f"⚠️ Migration warning: {e}")
+            
             # ===== DATABASE MIGRATION: Add last_hunger_update to pet_state =====
             try:
                 cursor.execute('PRAGMA table_info(pet_state)')
@@ -695,6 +742,16 @@ def init_database():
             ''')
             print("✅ Created game_rewards table")
             
+            # ===== DATABASE MIGRATION: One pet_state row per device (enables UPSERT) =====
+            try:
+                cursor.execute('''
+                    DELETE FROM pet_state
+                    WHERE id NOT IN (SELECT MAX(id) FROM pet_state GROUP BY device_id)
+                ''')
+                cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_pet_state_device ON pet_state(device_id)')
+            except Exception as e:
+                print(f"⚠️ Migration warning: {e}")
+            
             # Initialize one pet_state row if not exists
             cursor.execute('SELECT COUNT(*) FROM pet_state')
             if cursor.fetchone()[0] == 0:
@@ -818,6 +875,7 @@ def update_pet_state_atomic(device_id, update_fields: dict):
                 return update_pet_state_atomic(device_id, update_fields)
             
             conn.commit()
+            invalidate_oled_cache(device_id)
             print(f"✅ Pet state updated atomically (version {current_state['version']} → {new_state['version']})")
             return new_state
             
@@ -875,6 +933,44 @@ def get_pet_state(device_id='ESP32_001'):
         finally:
             conn.close()
 
+def get_pet_display_state(device_id='ESP32_001'):
+    """Get only the pet_state columns the OLED poll renders
+    
+    Narrower than get_pet_state(): no timestamps or lock/version fields
+    """
+    with db_lock:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT age, stage, health, hunger, cleanliness, happiness, energy,
+                       poop_present, current_menu, current_emotion
+                FROM pet_state
+                WHERE device_id = ?
+            ''', (device_id,))
+            
+            result = cursor.fetchone()
+            if not result:
+                return None
+            
+            return {
+                'age': result[0],
+                'stage': result[1],
+                'health': result[2],
+                'hunger': result[3],
+                'cleanliness': result[4],
+                'happiness': result[5],
+                'energy': result[6],
+                'poop_present': bool(result[7]),
+                'current_menu': result[8],
+                'current_emotion': result[9]
+            }
+        finally:
+            conn.close()
+
 def get_emotion_priority(state):
     """
     Return highest priority emotion based on pet state
@@ -1168,6 +1264,9 @@ def update_step_statistics():
                         ''', (device_id, today, total_today, peak_steps, avg_steps, activity))
                     
                     conn.commit()
+                    daily_step_totals[device_id] = (today, total_today)
+                    bump_step_counter_version()
+                    bump_step_stats_version()
                     print(f"📊 Step statistics updated: {total_today} total | {peak_steps} peak | Activity: {activity}")
                 
                 conn.close()
@@ -1190,6 +1289,8 @@ def handle_connect():
     try:
         print(f'Client connected: {request.sid}')
         connected_clients.add(request.sid)
+        # Per-device events (menu_changed, step_counter_updated) go to this room only
+        join_room(request.args.get('device_id', 'ESP32_001'))
         def emit_connection():
             with app.app_context():
                 socketio.emit('connection_response', {'status': 'Connected to dashboard'})
@@ -1232,6 +1333,109 @@ def index():
     """Serve the main dashboard HTML"""
     return app.send_static_file('index.html')
 
+def process_sensor_data(data):
+    """Shared pipeline for one sensor reading (JSON or binary upload)
+    
+    Runs step detection and orientation, stores the reading and broadcasts it.
+    Returns the Flask response tuple.
+    """
+    # Extract accelerometer data
+    accel_x = data.get('accel_x', 0)
+    accel_y = data.get('accel_y', 0)
+    accel_z = data.get('accel_z', 0)
+    
+    # 👣 COMPUTE STEP COUNT ON SERVER
+    import time
+    current_time = time.time()
+    
+    # NEW: Process sensor batch if available (multiple readings from ESP32)
+    total_steps_batch = 0
+    
+    # Reduced logging for performance
+    if data.get('sensor_batch') and data['sensor_batch'].get('readings'):
+        readings = data['sensor_batch']['readings']
+        
+        for idx, reading in enumerate(readings):
+            batch_accel_x = reading.get('accel_x', 0)
+            batch_accel_y = reading.get('accel_y', 0)
+            batch_accel_z = reading.get('accel_z', 0)
+            batch_time = current_time + (idx * 0.1)  # Approximate timing based on index
+            
+            steps_in_reading = detect_steps(batch_accel_x, batch_accel_y, batch_accel_z, batch_time)
+            total_steps_batch += steps_in_reading
+    else:
+        # Fall back to single reading detection
+        steps_in_reading = detect_steps(accel_x, accel_y, accel_z, current_time)
+        total_steps_batch = steps_in_reading
+    
+    # 🧭 COMPUTE ORIENTATION ON SERVER (moved from ESP32)
+    direction, confidence = detect_device_orientation(accel_x, accel_y, accel_z)
+    
+    # Add computed values to data
+    data['device_orientation'] = direction
+    data['orientation_confidence'] = confidence
+    data['calibrated_ax'] = accel_x
+    data['calibrated_ay'] = accel_y
+    data['calibrated_az'] = accel_z
+    data['step_count'] = total_steps_batch
+    
+    # Reduced logging - only show if steps detected or errors
+    if total_steps_batch > 0:
+        print(f'👣 Steps: {total_steps_batch} | Total: {step_count_global} | Dir: {direction}')
+    
+    # Store safely in database (including computed orientation)
+    success = store_sensor_data(data)
+    if not success:
+        return jsonify({'status': 'error', 'message': 'Database storage failed'}), 500
+    
+    # Broadcast to connected clients with orientation data
+    try:
+        # One timestamp shared by both broadcasts for this reading
+        timestamp = datetime.now().isoformat()
+        
+        def emit_sensor_update():
+            with app.app_context():
+                socketio.emit('sensor_update', {
+                    'timestamp': timestamp,
+                    'device_id': data.get('device_id', 'ESP32_001'),
+                    'accel_x': accel_x,
+                    'accel_y': accel_y, 
+                    'accel_z': accel_z,
+                    'gyro_x': data.get('gyro_x', 0),
+                    'gyro_y': data.get('gyro_y', 0),
+                    'gyro_z': data.get('gyro_z', 0),
+                    'mic_level': data.get('mic_level', 0),
+                    'sound_data': data.get('sound_data', 0),
+                    'chip_temperature': data.get('chip_temperature', 0)
+                })
+        
+        def emit_orientation():
+            with app.app_context():
+                socketio.emit('orientation_update', {
+                    'timestamp': timestamp,
+                    'device_id': data.get('device_id', 'ESP32_001'),
+                    'direction': direction,
+                    'calibrated_ax': accel_x,
+                    'calibrated_ay': accel_y,
+                    'calibrated_az': accel_z,
+                    'confidence': confidence
+                })
+        
+        socketio.start_background_task(emit_sensor_update)
+        socketio.start_background_task(emit_orientation)
+        
+        # 👟 Broadcast step counter update if steps were detected in this batch
+        if total_steps_batch > 0:
+            # Reduced logging for performance
+            broadcast_step_counter_update(step_count_global, 0, device_id=data.get('device_id', 'ESP32_001'))
+            
+            # 📊 Update step statistics immediately after detection
+            update_step_stats_immediate(device_id=data.get('device_id', 'ESP32_001'), steps=total_steps_batch)
+    except Exception as e:
+        print(f'Warning: SocketIO broadcast failed: {e}')
+    
+    return jsonify({'status': 'success', 'message': 'Data received and orientation computed'}), 200
+
 @app.route('/api/sensor-data', methods=['POST'])
 def receive_sensor_data():
     """Receive sensor data from ESP32 and compute orientation on server"""
@@ -1244,104 +1448,104 @@ def receive_sensor_data():
         if not data:
             return jsonify({'status': 'error', 'message': 'No data received'}), 400
         
-        # Extract accelerometer data
-        accel_x = data.get('accel_x', 0)
-        accel_y = data.get('accel_y', 0)
-        accel_z = data.get('accel_z', 0)
-        
-        # 👣 COMPUTE STEP COUNT ON SERVER
-        import time
-        current_time = time.time()
-        
-        # NEW: Process sensor batch if available (multiple readings from ESP32)
-        total_steps_batch = 0
-        
-        # Reduced logging for performance
-        if data.get('sensor_batch') and data['sensor_batch'].get('readings'):
-            readings = data['sensor_batch']['readings']
-            
-            for idx, reading in enumerate(readings):
-                batch_accel_x = reading.get('accel_x', 0)
-                batch_accel_y = reading.get('accel_y', 0)
-                batch_accel_z = reading.get('accel_z', 0)
-                batch_time = current_time + (idx * 0.1)  # Approximate timing based on index
-                
-                steps_in_reading = detect_steps(batch_accel_x, batch_accel_y, batch_accel_z, batch_time)
-                total_steps_batch += steps_in_reading
-        else:
-            # Fall back to single reading detection
-            steps_in_reading = detect_steps(accel_x, accel_y, accel_z, current_time)
-            total_steps_batch = steps_in_reading
-        
-        # 🧭 COMPUTE ORIENTATION ON SERVER (moved from ESP32)
-        direction, confidence = detect_device_orientation(accel_x, accel_y, accel_z)
-        
-        # Add computed values to data
-        data['device_orientation'] = direction
-        data['orientation_confidence'] = confidence
-        data['calibrated_ax'] = accel_x
-        data['calibrated_ay'] = accel_y
-        data['calibrated_az'] = accel_z
-        data['step_count'] = total_steps_batch
-        
-        # Reduced logging - only show if steps detected or errors
-        if total_steps_batch > 0:
-            print(f'👣 Steps: {total_steps_batch} | Total: {step_count_global} | Dir: {direction}')
-        
-        # Store safely in database (including computed orientation)
-        success = store_sensor_data(data)
-        if not success:
-            return jsonify({'status': 'error', 'message': 'Database storage failed'}), 500
-        
-        # Broadcast to connected clients with orientation data
-        try:
-            def emit_sensor_update():
-                with app.app_context():
-                    socketio.emit('sensor_update', {
-                        'timestamp': datetime.now().isoformat(),
-                        'device_id': data.get('device_id', 'ESP32_001'),
-                        'accel_x': accel_x,
-                        'accel_y': accel_y, 
-                        'accel_z': accel_z,
-                        'gyro_x': data.get('gyro_x', 0),
-                        'gyro_y': data.get('gyro_y', 0),
-                        'gyro_z': data.get('gyro_z', 0),
-                        'mic_level': data.get('mic_level', 0),
-                        'sound_data': data.get('sound_data', 0),
-                        'chip_temperature': data.get('chip_temperature', 0)
-                    })
-            
-            def emit_orientation():
-                with app.app_context():
-                    socketio.emit('orientation_update', {
-                        'timestamp': datetime.now().isoformat(),
-                        'device_id': data.get('device_id', 'ESP32_001'),
-                        'direction': direction,
-                        'calibrated_ax': accel_x,
-                        'calibrated_ay': accel_y,
-                        'calibrated_az': accel_z,
-                        'confidence': confidence
-                    })
-            
-            socketio.start_background_task(emit_sensor_update)
-            socketio.start_background_task(emit_orientation)
-            
-            # 👟 Broadcast step counter update if steps were detected in this batch
-            if total_steps_batch > 0:
-                # Reduced logging for performance
-                broadcast_step_counter_update(step_count_global, 0)
-                
-                # 📊 Update step statistics immediately after detection
-                update_step_stats_immediate(device_id=data.get('device_id', 'ESP32_001'), steps=total_steps_batch)
-        except Exception as e:
-            print(f'Warning: SocketIO broadcast failed: {e}')
-        
-        return jsonify({'status': 'success', 'message': 'Data received and orientation computed'}), 200
+        return process_sensor_data(data)
     
     except Exception as e:
         print(f'❌ Sensor data error: {e}')
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
+# Fixed binary frame from the ESP32 client: accel xyz, gyro xyz, mic level (float32) + sound (uint16)
+SENSOR_FRAME = struct.Struct('<7fH')
+SENSOR_FRAME_FIELDS = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'mic_level', 'sound_data')
+# Fire-and-forget UDP datagrams carry the same frames (no HTTP header, no response),
+# prefixed with the sender's device id: 1 length byte + ASCII device_id
+SENSOR_UDP_PORT = int(os.environ.get('SENSOR_UDP_PORT', 5001))
+
+def parse_udp_devices(spec):
+    """Parse SENSOR_UDP_DEVICES ("ESP32_001=192.168.1.50,ESP32_002=192.168.1.51") into {device_id: ip}"""
+    devices = {}
+    for entry in spec.split(','):
+        device_id, _, ip = entry.strip().partition('=')
+        if device_id and ip:
+            devices[device_id.strip()] = ip.strip()
+    return devices
+
+# Only these devices, sending from these addresses, may post readings over UDP
+SENSOR_UDP_DEVICES = parse_udp_devices(os.environ.get('SENSOR_UDP_DEVICES', ''))
+
+def decode_sensor_frames(frames, device_id):
+    """Unpack N x SENSOR_FRAME bytes into one reading for process_sensor_data
+    
+    The last frame is the current reading; with more than one frame, all of them
+    go through step detection as a sensor_batch like the JSON upload.
+    Returns None unless frames is a non-empty whole number of frames.
+    """
+    if not frames or len(frames) % SENSOR_FRAME.size:
+        return None
+    
+    readings = [dict(zip(SENSOR_FRAME_FIELDS, values)) for values in SENSOR_FRAME.iter_unpack(frames)]
+    data = dict(readings[-1], device_id=device_id)
+    if len(readings) > 1:
+        data['sensor_batch'] = {'reading_count': len(readings), 'readings': readings}
+    return data
+
+@app.route('/api/sensor-data/binary', methods=['POST'])
+def receive_sensor_data_binary():
+    """Receive packed sensor frames from ESP32 (application/octet-stream, N x 30 bytes)"""
+    try:
+        data = decode_sensor_frames(request.get_data(cache=False), request.args.get('device_id', 'ESP32_001'))
+        if data is None:
+            return jsonify({'status': 'error', 'message': f'Expected a multiple of {SENSOR_FRAME.size}-byte sensor frames'}), 400
+        
+        return process_sensor_data(data)
+    
+    except Exception as e:
+        print(f'❌ Binary sensor data error: {e}')
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+def split_udp_datagram(datagram):
+    """Split a sensor datagram into (device_id, frames); device_id is None if the prefix is malformed"""
+    if not datagram or len(datagram) < 1 + datagram[0]:
+        return None, datagram
+    id_end = 1 + datagram[0]
+    try:
+        return bytes(datagram[1:id_end]).decode('ascii'), datagram[id_end:]
+    except UnicodeDecodeError:
+        return None, datagram
+
+def sensor_udp_listener():
+    """Background task: feed UDP sensor datagrams from ESP32 through process_sensor_data"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.bind(('0.0.0.0', SENSOR_UDP_PORT))
+    except OSError as e:
+        # e.g. another gunicorn worker already owns the port
+        logger.warning('Sensor UDP listener not started on port %d: %s', SENSOR_UDP_PORT, e)
+        sock.close()
+        return
+    logger.info('Sensor UDP listener on port %d', SENSOR_UDP_PORT)
+    
+    buffer = bytearray(65535)
+    view = memoryview(buffer)
+    while True:
+        try:
+            size, addr = sock.recvfrom_into(buffer)
+            device_id, frames = split_udp_datagram(view[:size])
+            # Reject datagrams from unknown devices or from a device's unexpected address
+            if device_id is None or SENSOR_UDP_DEVICES.get(device_id) != addr[0]:
+                logger.warning('Dropped sensor datagram from unknown source %s (device %r)', addr[0], device_id)
+                continue
+            
+            data = decode_sensor_frames(frames, device_id)
+            if data is None:
+                logger.warning('Dropped %d-byte sensor datagram from %s', size, addr[0])
+                continue
+            
+            with app.app_context():
+                process_sensor_data(data)
+        except Exception:
+            logger.exception('UDP sensor data error')
+
 @app.route('/api/orientation-data', methods=['POST'])
 def receive_orientation_data():
     """Receive calibrated orientation/direction data from ESP32"""
@@ -1398,10 +1602,12 @@ def receive_orientation_data():
         
         # Broadcast orientation update to connected clients
         try:
+            timestamp = datetime.now().isoformat()
+            
             def emit_orientation_update():
                 with app.app_context():
                     socketio.emit('orientation_update', {
-                        'timestamp': datetime.now().isoformat(),
+                        'timestamp': timestamp,
                         'device_id': device_id,
                         'direction': direction,
                         'calibrated_ax': calibrated_ax,
@@ -1497,13 +1703,15 @@ def upload_binary_image():
             from datetime import datetime, timedelta
             
             # Feed logic (same as /api/pet/feed)
+            now = datetime.now()
+            fed_at = now.isoformat()
             updates = {
                 'hunger': max(0, state['hunger'] - 40),
-                'last_feed_time': datetime.now().isoformat(),
-                'last_hunger_update': datetime.now().isoformat(),  # CRITICAL: Reset hunger timer to prevent immediate re-increase
-                'digestion_due_time': (datetime.now() + timedelta(minutes=30)).isoformat(),
+                'last_feed_time': fed_at,
+                'last_hunger_update': fed_at,  # CRITICAL: Reset hunger timer to prevent immediate re-increase
+                'digestion_due_time': (now + timedelta(minutes=30)).isoformat(),
                 'current_emotion': 'EATING',
-                'emotion_expire_at': (datetime.now() + timedelta(seconds=3)).isoformat()
+                'emotion_expire_at': (now + timedelta(seconds=3)).isoformat()
             }
             
             result = update_pet_state_atomic(device_id, updates)
@@ -2124,6 +2332,7 @@ def update_step_stats_immediate(device_id, steps):
                 ''', (new_total, new_peak, device_id, today))
             else:
                 # Create new stats record
+                new_total = steps
                 cursor.execute('''
                     INSERT INTO step_statistics 
                     (device_id, date_recorded, total_steps, peak_steps, activity_level)
@@ -2132,10 +2341,40 @@ def update_step_stats_immediate(device_id, steps):
             
             conn.commit()
             conn.close()
+            daily_step_totals[device_id] = (today, new_total)
+            bump_step_counter_version()
+            bump_step_stats_version()
     
     except Exception as e:
         print(f"❌ Error updating immediate stats: {e}")
 
+def get_daily_steps(device_id):
+    """Steps recorded today for a device, served from memory
+    
+    The step_statistics writers publish every new total into daily_step_totals, so
+    the database is only read once per device per day to seed the value.
+    """
+    today = datetime.now().date()
+    cached = daily_step_totals.get(device_id)
+    if cached and cached[0] == today:
+        return cached[1]
+    
+    # Seed under db_lock so a concurrent step write can't be lost or counted twice
+    with db_lock:
+        cached = daily_step_totals.get(device_id)
+        if cached and cached[0] == today:
+            return cached[1]
+        
+        with pooled_db_connection() as conn:
+            if not conn:
+                return 0
+            
+            result = conn.execute(DAILY_STEPS_SQL, (device_id, today)).fetchone()
+        
+        daily_steps = result['total_steps'] if result and result['total_steps'] else 0
+        daily_step_totals[device_id] = (today, daily_steps)
+        return daily_steps
+
 def store_sensor_data(data):
     """Store sensor data with thread-safe database access, orientation computation, step counting, and event detection"""
     with db_lock:
@@ -2212,6 +2451,7 @@ def store_sensor_data(data):
                         print(f'🚨 MOTION EVENT: {accel_change:.2f} m/s² change from {device_id}')
             
             conn.commit()
+            bump_step_stats_version()
             return True
             
         except sqlite3.Error as e:
@@ -2225,6 +2465,62 @@ def store_sensor_data(data):
 
 # ==================== OLED DISPLAY ANIMATION CONTROL ====================
 
+# Animation ids accepted by /api/oled-display/set
+ANIMATION_NAMES = {
+    0: "INFANT",
+    1: "CHILD",
+    2: "ADULT",
+    3: "OLD"
+}
+VALID_ANIMATION_IDS = frozenset(ANIMATION_NAMES)
+
+# Map stage to animation_id for backward compatibility
+STAGE_TO_ANIMATION_ID = {
+    'INFANT': 0,
+    'CHILD': 1,
+    'ADULT': 2,
+    'OLD': 3,
+    'END': 3
+}
+
+# Menus accepted by /api/oled-display/menu-switch
+OLED_MENUS = ('MAIN', 'FOOD_MENU', 'TOILET_MENU')
+VALID_OLED_MENUS = frozenset(OLED_MENUS)
+
+# ESP32 polls /api/oled-display/get several times per second, but the answer only
+# changes when pet state or display flags are written, so keep the last payload
+# per device for a short TTL. Every writer below drops the entry after committing.
+OLED_CACHE_TTL = 0.5  # seconds
+oled_display_cache = {}  # device_id -> (cached_at, payload)
+oled_cache_lock = Lock()
+
+# Fallback answer when no pet_state row exists; constant, so serialize it once
+OLED_DEFAULT_STATE_JSON = json.dumps({
+    'status': 'success',
+    'animation_id': 0,
+    'stage': 'INFANT',
+    'emotion': 'IDLE',
+    'current_emotion': 'IDLE',
+    'current_menu': 'MAIN',
+    'health': 100,
+    'hunger': 0,
+    'cleanliness': 100,
+    'happiness': 100,
+    'energy': 100,
+    'poop_present': False,
+    'show_home_icon': True,  # Show home icon on main screen
+    'show_food_icon': False,
+    'show_poop_icon': False,
+    'screen_type': 'MAIN',
+    'mode': 'AUTOMATIC',
+    'message': 'Default INFANT state'
+}, separators=(',', ':'))
+
+def invalidate_oled_cache(device_id):
+    """Drop the cached OLED payload so the next poll reads fresh state"""
+    with oled_cache_lock:
+        oled_display_cache.pop(device_id, None)
+
 @app.route('/api/oled-display/get', methods=['GET'])
 def get_oled_display():
     """ESP32 polls this endpoint to get what animation to display on OLED
@@ -2235,50 +2531,31 @@ def get_oled_display():
     try:
         device_id = request.args.get('device_id', 'ESP32_001')
         
+        # Serve repeated polls from the short-lived cache
+        now = time.monotonic()
+        with oled_cache_lock:
+            cached = oled_display_cache.get(device_id)
+        if cached and now - cached[0] < OLED_CACHE_TTL:
+            return jsonify(cached[1]), 200
+        
         # Get pet state (automatically determines animation)
-        pet = get_pet_state(device_id)
+        pet = get_pet_display_state(device_id)
         
         if not pet:
             # Fallback if no pet state exists
-            return jsonify({
-                'status': 'success',
-                'animation_id': 0,
-                'stage': 'INFANT',
-                'emotion': 'IDLE',
-                'current_emotion': 'IDLE',
-                'current_menu': 'MAIN',
-                'health': 100,
-                'hunger': 0,
-                'cleanliness': 100,
-                'happiness': 100,
-                'energy': 100,
-                'poop_present': False,
-                'show_home_icon': True,  # Show home icon on main screen
-                'show_food_icon': False,
-                'show_poop_icon': False,
-                'screen_type': 'MAIN',
-                'mode': 'AUTOMATIC',
-                'message': 'Default INFANT state'
-            }), 200
-        
-        # Map stage to animation_id for backward compatibility
-        stage_to_id = {
-            'INFANT': 0,
-            'CHILD': 1,
-            'ADULT': 2,
-            'OLD': 3,
-            'END': 3
-        }
+            return app.response_class(OLED_DEFAULT_STATE_JSON, status=200, mimetype='application/json')
         
-        animation_id = stage_to_id.get(pet['stage'], 0)
+        animation_id = STAGE_TO_ANIMATION_ID.get(pet['stage'], 0)
         current_menu = pet['current_menu']
         play_eating = False
         play_cleaning = False
+        transitioned = False  # this poll wrote pet_state (one-time transition payload)
         
         # Handle menu state transitions based on pet state
         if pet['hunger'] <= 50 and current_menu == 'FOOD_MENU':
             # Pet just ate - trigger eating animation
             play_eating = True
+            transitioned = True
             with db_lock:
                 conn = get_db_connection()
                 if conn:
@@ -2286,15 +2563,16 @@ def get_oled_display():
                         cursor = conn.cursor()
                         cursor.execute('UPDATE pet_state SET current_emotion = ? WHERE device_id = ?', ('EATING', device_id))
                         conn.commit()
-                        pet = get_pet_state(device_id)
-                    except Exception as e:
-                        print(f'Error updating emotion: {e}')
+                        pet['current_emotion'] = 'EATING'
+                    except Exception:
+                        logger.exception('Error updating emotion')
                     finally:
                         conn.close()
         
         elif pet['current_emotion'] == 'EATING' and current_menu == 'FOOD_MENU':
             # Eating animation finished, return to MAIN
             current_menu = 'MAIN'
+            transitioned = True
             with db_lock:
                 conn = get_db_connection()
                 if conn:
@@ -2303,15 +2581,17 @@ def get_oled_display():
                         cursor.execute('UPDATE pet_state SET current_menu = ?, current_emotion = ? WHERE device_id = ?', 
                                      ('MAIN', 'IDLE', device_id))
                         conn.commit()
-                        pet = get_pet_state(device_id)
-                    except Exception as e:
-                        print(f'Error updating menu: {e}')
+                        pet['current_menu'] = 'MAIN'
+                        pet['current_emotion'] = 'IDLE'
+                    except Exception:
+                        logger.exception('Error updating menu')
                     finally:
                         conn.close()
         
         elif not pet['poop_present'] and current_menu == 'TOILET_MENU':
             # Pet is clean, return to MAIN
             current_menu = 'MAIN'
+            transitioned = True
             with db_lock:
                 conn = get_db_connection()
                 if conn:
@@ -2320,15 +2600,17 @@ def get_oled_display():
                         cursor.execute('UPDATE pet_state SET current_menu = ?, current_emotion = ? WHERE device_id = ?', 
                                      ('MAIN', 'IDLE', device_id))
                         conn.commit()
-                        pet = get_pet_state(device_id)
-                    except Exception as e:
-                        print(f'Error updating menu: {e}')
+                        pet['current_menu'] = 'MAIN'
+                        pet['current_emotion'] = 'IDLE'
+                    except Exception:
+                        logger.exception('Error updating menu')
                     finally:
                         conn.close()
         
-        print(f'🤖 OLED AUTOMATIC: {pet["stage"]} | Emotion:{pet["current_emotion"]} | Menu:{current_menu} | Health:{pet["health"]} Hunger:{pet["hunger"]}')
+        logger.debug('OLED AUTOMATIC: %s | Emotion:%s | Menu:%s | Health:%s Hunger:%s',
+                     pet['stage'], pet['current_emotion'], current_menu, pet['health'], pet['hunger'])
         
-        return jsonify({
+        payload = {
             'status': 'success',
             'animation_id': animation_id,
             'animation_name': pet['stage'],
@@ -2352,10 +2634,20 @@ def get_oled_display():
             'play_eating_animation': play_eating,
             'play_cleaning_animation': play_cleaning,
             'message': f'Auto: {pet["stage"]} | Emotion: {pet["current_emotion"]}'
-        }), 200
+        }
+        
+        if transitioned or play_eating or play_cleaning:
+            # Transition payloads must reach exactly one poll: don't replay them
+            # from the cache, and drop any entry from before the write
+            invalidate_oled_cache(device_id)
+        else:
+            with oled_cache_lock:
+                oled_display_cache[device_id] = (now, payload)
+        
+        return jsonify(payload), 200
     
     except Exception as e:
-        print(f'❌ Error getting OLED display: {e}')
+        logger.exception('Error getting OLED display')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -2376,17 +2668,10 @@ def set_oled_display():
         device_id = data.get('device_id', 'ESP32_001')
         
         # Validate animation_id value
-        if animation_id not in [0, 1, 2, 3]:
+        if not isinstance(animation_id, int) or animation_id not in VALID_ANIMATION_IDS:
             return jsonify({'status': 'error', 'message': 'Invalid animation_id. Must be 0-3'}), 400
         
-        animation_map = {
-            0: "INFANT",
-            1: "CHILD", 
-            2: "ADULT",
-            3: "OLD"
-        }
-        
-        animation_name = animation_map[animation_id]
+        animation_name = ANIMATION_NAMES[animation_id]
         
         # Update database with new state
         with db_lock:
@@ -2414,26 +2699,23 @@ def set_oled_display():
                     ''', (device_id, animation_type, animation_id, animation_name, 'web_ui'))
                 
                 conn.commit()
-                print(f'✅ OLED state updated in database: {animation_id} ({animation_name})')
-                print(f'   Device: {device_id} | Type: {animation_type}')
-            except sqlite3.Error as e:
-                print(f'❌ Database error: {e}')
+                invalidate_oled_cache(device_id)
+                logger.info('OLED state updated in database: %s (%s) | Device: %s | Type: %s',
+                            animation_id, animation_name, device_id, animation_type)
+            except sqlite3.Error:
+                logger.exception('Database error setting OLED display')
                 return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
             finally:
                 conn.close()
         
         # Broadcast animation change to all connected web clients (real-time)
-        def emit_oled_change():
-            with app.app_context():
-                socketio.emit('oled_display_changed', {
-                    'animation_type': animation_type,
-                    'animation_id': animation_id,
-                    'animation_name': animation_name,
-                    'device_id': device_id,
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        socketio.start_background_task(emit_oled_change)
+        socketio.emit('oled_display_changed', {
+            'animation_type': animation_type,
+            'animation_id': animation_id,
+            'animation_name': animation_name,
+            'device_id': device_id,
+            'timestamp': datetime.now().isoformat()
+        })
         
         return jsonify({
             'status': 'success',
@@ -2445,7 +2727,7 @@ def set_oled_display():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error setting OLED display: {e}')
+        logger.exception('Error setting OLED display')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -2469,23 +2751,20 @@ def reset_oled_display():
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM oled_display_state WHERE device_id = ?', (device_id,))
                 conn.commit()
-                print(f'✅ OLED display reset to AI mode for device: {device_id}')
-            except sqlite3.Error as e:
-                print(f'❌ Database error: {e}')
+                invalidate_oled_cache(device_id)
+                logger.info('OLED display reset to AI mode for device: %s', device_id)
+            except sqlite3.Error:
+                logger.exception('Database error resetting OLED display')
                 return jsonify({'status': 'error', 'message': 'Database reset failed'}), 500
             finally:
                 conn.close()
         
         # Broadcast reset to all connected web clients
-        def emit_oled_reset():
-            with app.app_context():
-                socketio.emit('oled_display_reset', {
-                    'device_id': device_id,
-                    'mode': 'AI',
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        socketio.start_background_task(emit_oled_reset)
+        socketio.emit('oled_display_reset', {
+            'device_id': device_id,
+            'mode': 'AI',
+            'timestamp': datetime.now().isoformat()
+        })
         
         return jsonify({
             'status': 'success',
@@ -2495,7 +2774,7 @@ def reset_oled_display():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error resetting OLED display: {e}')
+        logger.exception('Error resetting OLED display')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/device/startup-complete', methods=['POST'])
@@ -2512,8 +2791,8 @@ def device_startup_complete():
         status = data.get('status', 'unknown')
         pet_stage = data.get('pet_stage', 0)
         
-        print(f'✅ Device startup notification received from {device_id}')
-        print(f'   Status: {status} | Pet Stage: {pet_stage}')
+        logger.info('Device startup notification from %s | Status: %s | Pet Stage: %s',
+                    device_id, status, pet_stage)
         
         # RESET TO INFANT on every device startup
         animation_id = 0  # INFANT
@@ -2528,33 +2807,34 @@ def device_startup_complete():
                 try:
                     cursor = conn.cursor()
                     
-                    # Reset OLED display state to INFANT
+                    # Take the write lock once for the whole reset (single WAL commit)
+                    cursor.execute('BEGIN IMMEDIATE')
+                    
+                    # Reset OLED display state to INFANT (row created if missing)
                     cursor.execute('''
-                        UPDATE oled_display_state
-                        SET animation_id = ?, 
-                            animation_name = ?, 
+                        INSERT INTO oled_display_state
+                        (device_id, animation_id, animation_name, animation_type, show_home_icon, screen_type, updated_by)
+                        VALUES (?, ?, ?, 'pet', ?, ?, 'device_startup')
+                        ON CONFLICT(device_id) DO UPDATE SET
+                            animation_id = excluded.animation_id,
+                            animation_name = excluded.animation_name,
                             animation_type = 'pet',
-                            show_home_icon = ?,
+                            show_home_icon = excluded.show_home_icon,
                             show_food_icon = 0,
                             show_poop_icon = 0,
-                            screen_type = ?,
+                            screen_type = excluded.screen_type,
                             updated_at = CURRENT_TIMESTAMP,
                             updated_by = 'device_startup'
-                        WHERE device_id = ?
-                    ''', (animation_id, animation_name, show_home_icon, screen_type, device_id))
-                    
-                    if cursor.rowcount == 0:
-                        # Insert if not exists
-                        cursor.execute('''
-                            INSERT INTO oled_display_state
-                            (device_id, animation_id, animation_name, animation_type, show_home_icon, screen_type, updated_by)
-                            VALUES (?, ?, ?, 'pet', ?, ?, 'device_startup')
-                        ''', (device_id, animation_id, animation_name, show_home_icon, screen_type))
+                    ''', (device_id, animation_id, animation_name, show_home_icon, screen_type))
                     
-                    # Reset pet_state to INFANT with fresh stats
+                    # Reset pet_state to INFANT with fresh stats (row created if missing)
                     cursor.execute('''
-                        UPDATE pet_state
-                        SET age = 0,
+                        INSERT INTO pet_state
+                        (device_id, age, stage, health, hunger, cleanliness, happiness, energy,
+                         current_menu, current_emotion, last_age_increment)
+                        VALUES (?, 0, 'INFANT', 100, 0, 100, 100, 100, 'MAIN', 'IDLE', CURRENT_TIMESTAMP)
+                        ON CONFLICT(device_id) DO UPDATE SET
+                            age = 0,
                             stage = 'INFANT',
                             health = 100,
                             hunger = 0,
@@ -2574,21 +2854,15 @@ def device_startup_complete():
                             last_clean_time = NULL,
                             last_age_increment = CURRENT_TIMESTAMP,
                             updated_at = CURRENT_TIMESTAMP
-                        WHERE device_id = ?
                     ''', (device_id,))
                     
-                    if cursor.rowcount == 0:
-                        # Insert if pet_state doesn't exist
-                        cursor.execute('''
-                            INSERT INTO pet_state 
-                            (device_id, age, stage, health, hunger, cleanliness, happiness, energy,
-                             current_menu, current_emotion, last_age_increment)
-                            VALUES (?, 0, 'INFANT', 100, 0, 100, 100, 100, 'MAIN', 'IDLE', CURRENT_TIMESTAMP)
-                        ''', (device_id,))
-                    
                     conn.commit()
-                    print(f'🔄 Database RESET to INFANT for {device_id} (display + pet state)')
+                    invalidate_oled_cache(device_id)
+                    logger.info('Database RESET to INFANT for %s (display + pet state)', device_id)
                     
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
                 finally:
                     conn.close()
         
@@ -2603,9 +2877,42 @@ def device_startup_complete():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error handling device startup: {e}')
+        logger.exception('Error handling device startup')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# One UPSERT per icon column, built once so every toggle reuses the same SQL text
+OLED_ICON_UPSERTS = {
+    column: f'''
+        INSERT INTO oled_display_state (device_id, {column}, updated_by)
+        VALUES (?, ?, 'web_ui')
+        ON CONFLICT(device_id) DO UPDATE SET
+            {column} = excluded.{column},
+            updated_at = CURRENT_TIMESTAMP,
+            updated_by = 'web_ui'
+    '''
+    for column in ('show_home_icon', 'show_food_icon', 'show_poop_icon')
+}
+
+def set_oled_icon(device_id, column, value):
+    """Store one OLED icon flag for a device (row is created if missing)
+    
+    Returns True on success, False on database failure
+    """
+    with db_lock:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        try:
+            conn.execute(OLED_ICON_UPSERTS[column], (device_id, value))
+            invalidate_oled_cache(device_id)
+            return True
+        except sqlite3.Error:
+            logger.exception('Database error updating %s', column)
+            return False
+        finally:
+            conn.close()
+
 @app.route('/api/oled-display/home-icon-toggle', methods=['POST'])
 def toggle_home_icon():
     """Toggle home icon display on OLED
@@ -2617,48 +2924,16 @@ def toggle_home_icon():
         device_id = data.get('device_id', 'ESP32_001')
         show_home_icon = data.get('show_home_icon', False)
         
-        with db_lock:
-            conn = get_db_connection()
-            if not conn:
-                return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
-            
-            try:
-                cursor = conn.cursor()
-                
-                # Update home icon state
-                cursor.execute('''
-                    UPDATE oled_display_state
-                    SET show_home_icon = ?, updated_at = CURRENT_TIMESTAMP, updated_by = 'web_ui'
-                    WHERE device_id = ?
-                ''', (show_home_icon, device_id))
-                
-                if cursor.rowcount == 0:
-                    # Insert if not exists
-                    cursor.execute('''
-                        INSERT INTO oled_display_state
-                        (device_id, show_home_icon, updated_by)
-                        VALUES (?, ?, ?)
-                    ''', (device_id, show_home_icon, 'web_ui'))
-                
-                conn.commit()
-                print(f'🏠 Home icon toggled to: {show_home_icon} for device {device_id}')
-                
-            except sqlite3.Error as e:
-                print(f'❌ Database error: {e}')
-                return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
-            finally:
-                conn.close()
+        if not set_oled_icon(device_id, 'show_home_icon', show_home_icon):
+            return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
+        logger.debug('Home icon toggled to: %s for device %s', show_home_icon, device_id)
         
         # Broadcast change to all web clients
-        def emit_home_icon_change():
-            with app.app_context():
-                socketio.emit('home_icon_changed', {
-                    'show_home_icon': show_home_icon,
-                    'device_id': device_id,
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        socketio.start_background_task(emit_home_icon_change)
+        socketio.emit('home_icon_changed', {
+            'show_home_icon': show_home_icon,
+            'device_id': device_id,
+            'timestamp': datetime.now().isoformat()
+        })
         
         return jsonify({
             'status': 'success',
@@ -2668,7 +2943,7 @@ def toggle_home_icon():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error toggling home icon: {e}')
+        logger.exception('Error toggling home icon')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/oled-display/food-icon-toggle', methods=['POST'])
@@ -2682,48 +2957,16 @@ def toggle_food_icon():
         device_id = data.get('device_id', 'ESP32_001')
         show_food_icon = data.get('show_food_icon', False)
         
-        with db_lock:
-            conn = get_db_connection()
-            if not conn:
-                return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
-            
-            try:
-                cursor = conn.cursor()
-                
-                # Update food icon state
-                cursor.execute('''
-                    UPDATE oled_display_state
-                    SET show_food_icon = ?, updated_at = CURRENT_TIMESTAMP, updated_by = 'web_ui'
-                    WHERE device_id = ?
-                ''', (show_food_icon, device_id))
-                
-                if cursor.rowcount == 0:
-                    # Insert if not exists
-                    cursor.execute('''
-                        INSERT INTO oled_display_state
-                        (device_id, show_food_icon, updated_by)
-                        VALUES (?, ?, ?)
-                    ''', (device_id, show_food_icon, 'web_ui'))
-                
-                conn.commit()
-                print(f'🍽️  Food icon toggled to: {show_food_icon} for device {device_id}')
-                
-            except sqlite3.Error as e:
-                print(f'❌ Database error: {e}')
-                return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
-            finally:
-                conn.close()
+        if not set_oled_icon(device_id, 'show_food_icon', show_food_icon):
+            return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
+        logger.debug('Food icon toggled to: %s for device %s', show_food_icon, device_id)
         
         # Broadcast change to all web clients
-        def emit_food_icon_change():
-            with app.app_context():
-                socketio.emit('food_icon_changed', {
-                    'show_food_icon': show_food_icon,
-                    'device_id': device_id,
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        socketio.start_background_task(emit_food_icon_change)
+        socketio.emit('food_icon_changed', {
+            'show_food_icon': show_food_icon,
+            'device_id': device_id,
+            'timestamp': datetime.now().isoformat()
+        })
         
         return jsonify({
             'status': 'success',
@@ -2733,7 +2976,7 @@ def toggle_food_icon():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error toggling food icon: {e}')
+        logger.exception('Error toggling food icon')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -2748,48 +2991,16 @@ def toggle_poop_icon():
         device_id = data.get('device_id', 'ESP32_001')
         show_poop_icon = data.get('show_poop_icon', False)
         
-        with db_lock:
-            conn = get_db_connection()
-            if not conn:
-                return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
-            
-            try:
-                cursor = conn.cursor()
-                
-                # Update poop icon state
-                cursor.execute('''
-                    UPDATE oled_display_state
-                    SET show_poop_icon = ?, updated_at = CURRENT_TIMESTAMP, updated_by = 'web_ui'
-                    WHERE device_id = ?
-                ''', (show_poop_icon, device_id))
-                
-                if cursor.rowcount == 0:
-                    # Insert if not exists
-                    cursor.execute('''
-                        INSERT INTO oled_display_state
-                        (device_id, show_poop_icon, updated_by)
-                        VALUES (?, ?, ?)
-                    ''', (device_id, show_poop_icon, 'web_ui'))
-                
-                conn.commit()
-                print(f'💩 Poop icon toggled to: {show_poop_icon} for device {device_id}')
-                
-            except sqlite3.Error as e:
-                print(f'❌ Database error: {e}')
-                return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
-            finally:
-                conn.close()
+        if not set_oled_icon(device_id, 'show_poop_icon', show_poop_icon):
+            return jsonify({'status': 'error', 'message': 'Database update failed'}), 500
+        logger.debug('Poop icon toggled to: %s for device %s', show_poop_icon, device_id)
         
         # Broadcast change to all web clients
-        def emit_poop_icon_change():
-            with app.app_context():
-                socketio.emit('poop_icon_changed', {
-                    'show_poop_icon': show_poop_icon,
-                    'device_id': device_id,
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        socketio.start_background_task(emit_poop_icon_change)
+        socketio.emit('poop_icon_changed', {
+            'show_poop_icon': show_poop_icon,
+            'device_id': device_id,
+            'timestamp': datetime.now().isoformat()
+        })
         
         return jsonify({
             'status': 'success',
@@ -2799,10 +3010,47 @@ def toggle_poop_icon():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error toggling poop icon: {e}')
+        logger.exception('Error toggling poop icon')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+# Latest menu per device waiting to be broadcast; one emitter task drains it so a burst
+# of switches becomes a single menu_changed per device
+MENU_EMIT_WINDOW = 0.01  # seconds to wait for more switches before broadcasting
+pending_menu_changes = {}  # device_id -> menu
+pending_menu_lock = Lock()
+menu_emit_event = Event()
+# Under eventlet/gevent an emit from the request greenlet doesn't block, so skip the queue hop
+EMIT_MENU_INLINE = socketio.async_mode in ('eventlet', 'gevent', 'gevent_uwsgi')
+
+def queue_menu_change(device_id, menu):
+    """Queue a menu_changed broadcast (replaces any not yet sent for this device)"""
+    with pending_menu_lock:
+        pending_menu_changes[device_id] = menu
+    menu_emit_event.set()
+
+def menu_change_emitter():
+    """Background task: broadcast queued menu switches in coalesced batches"""
+    while True:
+        menu_emit_event.wait()
+        menu_emit_event.clear()
+        socketio.sleep(MENU_EMIT_WINDOW)
+        
+        with pending_menu_lock:
+            pending = pending_menu_changes.copy()
+            pending_menu_changes.clear()
+        
+        for device_id, menu in pending.items():
+            try:
+                socketio.emit('menu_changed', {
+                    'device_id': device_id,
+                    'menu': menu
+                }, namespace='/', to=device_id)
+            except Exception:
+                logger.exception('Error broadcasting menu change')
+
+socketio.start_background_task(menu_change_emitter)
+
 @app.route('/api/oled-display/menu-switch', methods=['POST'])
 def switch_menu():
     """Switch current menu (MAIN/FOOD_MENU/TOILET_MENU)
@@ -2815,33 +3063,32 @@ def switch_menu():
         menu = data.get('menu', 'MAIN')  # MAIN, FOOD_MENU, TOILET_MENU
         
         # Validate menu value
-        valid_menus = ['MAIN', 'FOOD_MENU', 'TOILET_MENU']
-        if menu not in valid_menus:
-            return jsonify({'status': 'error', 'message': f'Invalid menu. Must be one of: {valid_menus}'}), 400
+        if not isinstance(menu, str) or menu not in VALID_OLED_MENUS:
+            return jsonify({'status': 'error', 'message': f'Invalid menu. Must be one of: {list(OLED_MENUS)}'}), 400
         
         # Update pet state with new menu
-        with db_lock:
-            conn = get_db_connection()
+        with db_lock, pooled_db_connection() as conn:
             if conn:
                 try:
                     cursor = conn.cursor()
-                    cursor.execute('UPDATE pet_state SET current_menu = ? WHERE device_id = ?', (menu, device_id))
+                    # Take the write lock up front so the update never has to upgrade mid-transaction
+                    cursor.execute('BEGIN IMMEDIATE')
+                    cursor.execute(UPDATE_MENU_SQL, (menu, device_id))
                     conn.commit()
-                    print(f'📱 Menu switched to: {menu}')
+                    invalidate_oled_cache(device_id)
+                    logger.info('Menu switched to: %s', menu)
                 except Exception as e:
-                    print(f'Error switching menu: {e}')
+                    logger.exception('Error switching menu')
                     return jsonify({'status': 'error', 'message': str(e)}), 500
-                finally:
-                    conn.close()
         
         # Broadcast menu change to connected clients
-        def emit_menu_change():
+        if EMIT_MENU_INLINE:
             socketio.emit('menu_changed', {
                 'device_id': device_id,
                 'menu': menu
-            }, namespace='/')
-        
-        socketio.start_background_task(emit_menu_change)
+            }, namespace='/', to=device_id)
+        else:
+            queue_menu_change(device_id, menu)
         
         return jsonify({
             'status': 'success',
@@ -2851,87 +3098,95 @@ def switch_menu():
         }), 200
         
     except Exception as e:
-        print(f'❌ Error switching menu: {e}')
+        logger.exception('Error switching menu')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 # ================= STEP COUNTER ENDPOINTS =================
 
+def handle_api_errors(view):
+    """Shared error handling for JSON endpoints: any failure becomes a 500 error payload"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except sqlite3.Error:
+            logger.exception('Database error in %s', view.__name__)
+            return jsonify({'status': 'error', 'message': 'Database query failed'}), 500
+        except Exception as e:
+            logger.exception('Error in %s', view.__name__)
+            return jsonify({'status': 'error', 'message': str(e)}), 500
+    return wrapper
+
+def not_modified(etag):
+    """Empty 304 for a poll whose weak ETag still matches"""
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
 @app.route('/api/step-counter/get', methods=['GET'])
+@handle_api_errors
 def get_step_counter():
     """Get current step counter from server
     
     Returns total steps detected by server-side accelerometer analysis
     """
-    try:
-        device_id = request.args.get('device_id', 'ESP32_001')
-        
-        # Get total steps from global counter
-        total_steps = step_count_global
-        
-        # Optional: Get daily steps from database
-        with db_lock:
-            conn = get_db_connection()
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT SUM(step_count) as daily_steps
-                    FROM sensor_readings
-                    WHERE device_id = ? AND DATE(timestamp) = DATE('now')
-                ''', (device_id,))
-                result = cursor.fetchone()
-                daily_steps = result[0] if result and result[0] else 0
-                conn.close()
-            else:
-                daily_steps = 0
-        
-        return jsonify({
-            'status': 'success',
-            'device_id': device_id,
-            'total_steps': total_steps,
-            'daily_steps': daily_steps or 0,
-            'timestamp': datetime.now().isoformat()
-        }), 200
-        
-    except Exception as e:
-        print(f'❌ Error getting step counter: {e}')
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    device_id = request.args.get('device_id', 'ESP32_001')
+    
+    # Unchanged since the client's last poll (date included for the midnight rollover)
+    etag = f'{step_counter_version}-{datetime.now().date()}'
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    
+    # Get total steps from global counter
+    total_steps = step_count_global
+    
+    # Daily steps come from the in-memory mirror of today's step_statistics row
+    daily_steps = get_daily_steps(device_id)
+    
+    response = jsonify({
+        'status': 'success',
+        'device_id': device_id,
+        'total_steps': total_steps,
+        'daily_steps': daily_steps or 0,
+        'timestamp': iso_now_seconds()
+    })
+    response.set_etag(etag, weak=True)
+    return response, 200
 
 @app.route('/api/step-counter/reset', methods=['POST'])
+@handle_api_errors
 def reset_step_counter():
     """Reset step counter
     
     Resets the global step counter to 0 (fresh session)
     """
-    try:
-        global step_count_global
-        device_id = request.args.get('device_id', 'ESP32_001')
-        old_count = step_count_global
-        
-        # Reset counter
-        step_count_global = 0
-        
-        # Clear the acceleration history for clean slate
-        accel_history.clear()
-        
-        print(f'🔄 Step counter reset: {old_count} → 0')
-        
-        # Broadcast reset to all clients
-        broadcast_step_counter_update(0, 0)
-        
-        return jsonify({
-            'status': 'success',
-            'device_id': device_id,
-            'reset_from': old_count,
-            'new_count': 0,
-            'message': 'Step counter reset to 0',
-            'timestamp': datetime.now().isoformat()
-        }), 200
-        
-    except Exception as e:
-        print(f'❌ Error resetting step counter: {e}')
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    global step_count_global
+    device_id = request.args.get('device_id', 'ESP32_001')
+    old_count = step_count_global
+    
+    # Reset counter
+    step_count_global = 0
+    bump_step_counter_version()
+    
+    # Clear the acceleration history for clean slate
+    accel_history.clear()
+    
+    logger.info('Step counter reset: %s -> 0', old_count)
+    
+    # Broadcast reset to the device's clients
+    broadcast_step_counter_update(0, 0, device_id=device_id)
+    
+    return jsonify({
+        'status': 'success',
+        'device_id': device_id,
+        'reset_from': old_count,
+        'new_count': 0,
+        'message': 'Step counter reset to 0',
+        'timestamp': iso_now_seconds()
+    }), 200
 
 @app.route('/api/step-counter/stats', methods=['GET'])
+@handle_api_errors
 def get_step_stats():
     """Get detailed step counter statistics with daily aggregation and trends
     
@@ -2941,124 +3196,84 @@ def get_step_stats():
     - Comparison with previous data
     - Activity trends
     """
-    try:
-        device_id = request.args.get('device_id', 'ESP32_001')
-        days = request.args.get('days', 7, type=int)  # Last N days
-        
-        with db_lock:
-            conn = get_db_connection()
-            if not conn:
-                return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
-            
-            try:
-                cursor = conn.cursor()
-                
-                # Get daily aggregated statistics
-                cursor.execute('''
-                    SELECT 
-                        date_recorded,
-                        total_steps,
-                        peak_steps,
-                        avg_step_interval,
-                        activity_level,
-                        updated_at
-                    FROM step_statistics
-                    WHERE device_id = ? AND date_recorded >= DATE('now', '-' || ? || ' days')
-                    ORDER BY date_recorded DESC
-                ''', (device_id, days))
-                
-                daily_stats = [{
-                    'date': str(row[0]),
-                    'total_steps': row[1],
-                    'peak_steps': row[2],
-                    'avg_step_interval': round(row[3], 2),
-                    'activity_level': row[4],
-                    'updated_at': str(row[5])
-                } for row in cursor.fetchall()]
-                
-                # Get today's detailed batch data
-                today = datetime.now().date()
-                cursor.execute('''
-                    SELECT 
-                        timestamp,
-                        step_count,
-                        accel_x, accel_y, accel_z,
-                        SUM(step_count) OVER (ORDER BY timestamp) as cumulative_steps
-                    FROM sensor_readings
-                    WHERE device_id = ? AND DATE(timestamp) = ?
-                    ORDER BY timestamp DESC
-                    LIMIT 20
-                ''', (device_id, today))
-                
-                batch_details = [{
-                    'timestamp': str(row[0]),
-                    'steps_in_batch': row[1],
-                    'accel': [round(row[2], 3), round(row[3], 3), round(row[4], 3)],
-                    'cumulative': row[5]
-                } for row in cursor.fetchall()]
-                
-                # Calculate trends
-                cursor.execute('''
-                    SELECT 
-                        total_steps,
-                        activity_level
-                    FROM step_statistics
-                    WHERE device_id = ? AND date_recorded >= DATE('now', '-7 days')
-                    ORDER BY date_recorded ASC
-                ''', (device_id,))
-                
-                weekly_data = cursor.fetchall()
-                trend = None
-                if len(weekly_data) >= 2:
-                    last_week = sum([row[0] or 0 for row in weekly_data])
-                    
-                    # Compare with previous week
-                    cursor.execute('''
-                        SELECT SUM(total_steps)
-                        FROM step_statistics
-                        WHERE device_id = ? 
-                        AND date_recorded >= DATE('now', '-14 days')
-                        AND date_recorded < DATE('now', '-7 days')
-                    ''', (device_id,))
-                    
-                    prev_week_result = cursor.fetchone()
-                    prev_week = prev_week_result[0] or 0
-                    
-                    if prev_week > 0:
-                        trend_percent = ((last_week - prev_week) / prev_week) * 100
-                        trend = {
-                            'last_week': last_week,
-                            'previous_week': prev_week,
-                            'change_percent': round(trend_percent, 1),
-                            'direction': 'up' if trend_percent > 0 else 'down' if trend_percent < 0 else 'stable'
-                        }
-                
-                return jsonify({
-                    'status': 'success',
-                    'device_id': device_id,
-                    'current_total': step_count_global,
-                    'today': str(today),
-                    'daily_statistics': daily_stats,
-                    'today_details': batch_details,
-                    'trend': trend,
-                    'summary': {
-                        'total_days_tracked': len(daily_stats),
-                        'avg_daily_steps': round(sum([s['total_steps'] for s in daily_stats]) / len(daily_stats), 1) if daily_stats else 0,
-                        'max_daily_steps': max([s['total_steps'] for s in daily_stats]) if daily_stats else 0,
-                        'total_batches_today': len(batch_details)
-                    },
-                    'timestamp': datetime.now().isoformat()
-                }), 200
-                
-            except sqlite3.Error as e:
-                print(f'❌ Database error: {e}')
-                return jsonify({'status': 'error', 'message': 'Database query failed'}), 500
-            finally:
-                conn.close()
+    device_id = request.args.get('device_id', 'ESP32_001')
+    days = request.args.get('days', 7, type=int)  # Last N days
     
-    except Exception as e:
-        print(f'❌ Error getting step stats: {e}')
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    # Unchanged since the client's last poll (date included for the rolling windows)
+    etag = f'{step_counter_version}-{step_stats_version}-{datetime.now().date()}'
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    
+    with pooled_db_connection() as conn:
+        if not conn:
+            return jsonify({'status': 'error', 'message': 'Database connection failed'}), 500
+        
+        cursor = conn.cursor()
+        
+        # Window boundaries on the same local-date keys the step_statistics writers use
+        today = datetime.now().date()
+        cutoff = (today - timedelta(days=days)).isoformat()
+        week_start = (today - timedelta(days=7)).isoformat()
+        prev_week_start = (today - timedelta(days=14)).isoformat()
+        
+        # Daily rows for the requested window plus every summary/trend aggregate in one pass
+        cursor.execute(STEP_STATS_SQL, (device_id, cutoff, week_start, week_start, week_start,
+                                        device_id, prev_week_start))
+        
+        totals = cursor.fetchone()  # aggregate columns are repeated on every row
+        
+        daily_stats = [{
+            'date': row['date_recorded'],
+            'total_steps': row['total_steps'],
+            'peak_steps': row['peak_steps'],
+            'avg_step_interval': row['avg_step_interval'],
+            'activity_level': row['activity_level'],
+            'updated_at': row['updated_at']
+        } for row in itertools.chain((totals,), cursor) if row['date_recorded'] is not None]
+        
+        # Get today's detailed batch data (half-open range so the device/timestamp index is used)
+        cursor.execute(TODAY_BATCHES_SQL, (device_id, today.isoformat(), (today + timedelta(days=1)).isoformat()))
+        
+        batch_details = [{
+            'timestamp': row['timestamp'],
+            'steps_in_batch': row['step_count'],
+            'accel': [row['accel_x'], row['accel_y'], row['accel_z']],
+            'cumulative': row['cumulative_steps']
+        } for row in cursor]
+        
+        # Calculate trends (needs at least two days of data this week)
+        trend = None
+        if (totals['week_days'] or 0) >= 2:
+            last_week = totals['last_week'] or 0
+            prev_week = totals['prev_week'] or 0
+            
+            if prev_week > 0:
+                trend_percent = ((last_week - prev_week) / prev_week) * 100
+                trend = {
+                    'last_week': last_week,
+                    'previous_week': prev_week,
+                    'change_percent': round(trend_percent, 1),
+                    'direction': 'up' if trend_percent > 0 else 'down' if trend_percent < 0 else 'stable'
+                }
+        
+        response = jsonify({
+            'status': 'success',
+            'device_id': device_id,
+            'current_total': step_count_global,
+            'today': str(today),
+            'daily_statistics': daily_stats,
+            'today_details': batch_details,
+            'trend': trend,
+            'summary': {
+                'total_days_tracked': totals['days_tracked'],
+                'avg_daily_steps': totals['avg_daily_steps'],
+                'max_daily_steps': totals['max_daily_steps'],
+                'total_batches_today': len(batch_details)
+            },
+            'timestamp': iso_now_seconds()
+        })
+        response.set_etag(etag, weak=True)
+        return response, 200
 
 # ==================== Error Handlers ====================
 
@@ -3098,6 +3313,7 @@ if __name__ == '__main__':
     print('🔌 WebSocket: ws://192.168.1.6:5000/socket.io/')
     print('📡 Endpoints:')
     print('   • POST /api/sensor-data (JSON, ~146 bytes)')
+    print(f'   • UDP  :{SENSOR_UDP_PORT} (binary sensor frames, 30 bytes each; devices in SENSOR_UDP_DEVICES)')
     print('   • POST /upload (Binary, ~1-3KB)')  
     print('   • POST /upload-audio (JSON, ~32KB+)')
     print('   • GET  /api/oled-display/get (Pet AI state)')
@@ -3111,6 +3327,13 @@ if __name__ == '__main__':
         print('❌ Database initialization failed. Exiting.')
         exit(1)
     
+    # UDP sensor listener: started by the server process only (importing app binds no port),
+    # and only when SENSOR_UDP_DEVICES says which devices may send
+    if SENSOR_UDP_DEVICES:
+        socketio.start_background_task(sensor_udp_listener)
+    else:
+        print(f'ℹ️ UDP sensor listener disabled (set SENSOR_UDP_DEVICES to enable port {SENSOR_UDP_PORT})')
+    
     try:
         # Run the app with stability-focused configuration
         socketio.run(app, 
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+AI Vision Analysis for the ESP32 Dashboard
+Google ViT image captioning with a PIL/numpy fallback, kept free of Flask app and
+database side effects so test scripts can import it without starting the server
+"""
+
+import os
+
+# AI Vision imports - Google ViT Model
+try:
+    from PIL import Image
+    import numpy as np
+    from transformers import pipeline
+    import torch
+    AI_AVAILABLE = True
+    AI_MODE = "FULL"
+    print("✅ Google ViT AI Vision model enabled (FULL mode with transformers)")
+except ImportError as e:
+    print(f"⚠️ FullAI modules not available: {e}")
+    try:
+        from PIL import Image
+        import numpy as np
+        AI_AVAILABLE = True
+        AI_MODE = "BASIC"
+        print("⚠️ Fallback to Basic AI Vision mode (PIL + image analysis)")
+    except ImportError as e2:
+        print(f"❌ No AI modules available: {e2}")
+        AI_AVAILABLE = False
+        AI_MODE = "NONE"
+
+# AI Configuration
+if AI_AVAILABLE:
+    CACHE_DIR = r"E:\Rajeev\esp 32\esp 32\.cache\huggingface"
+    os.environ['HUGGINGFACE_HUB_CACHE'] = CACHE_DIR
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    
+    # Determine device: GPU if available, otherwise CPU
+    try:
+        AI_DEVICE = 0 if torch.cuda.is_available() else -1
+        if torch.cuda.is_available():
+            print(f"✅ GPU available: {torch.cuda.get_device_name(0)}")
+        else:
+            print("⚠️ GPU not available, using CPU for AI analysis")
+    except:
+        AI_DEVICE = -1
+        print("⚠️ Using CPU for AI analysis")
+    
+    # Initialize AI model (lazy loading)
+    ai_classifier = None
+
+# AI Analysis Function with fallback
+def analyze_image_with_ai(image_path):
+    """Analyze image using AI models or basic image analysis as fallback"""
+    global ai_classifier
+    
+    if not AI_AVAILABLE:
+        return "AI analysis not available - missing dependencies"
+    
+    try:
+        if AI_MODE == "FULL":
+            # Full AI Model Analysis (Google ViT)
+            if ai_classifier is None:
+                print("Loading Google ViT vision model...")
+                ai_classifier = pipeline(
+                    "image-classification",
+                    model="google/vit-base-patch16-224",
+                    device=AI_DEVICE
+                )
+                print("Google ViT model loaded successfully")
+            
+            # Load and analyze image
+            image = Image.open(image_path)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            
+            # Get AI predictions
+            results = ai_classifier(image, top_k=5)
+            
+            # Generate natural caption 
+            top_result = results[0]
+            confidence = top_result['score'] * 100
+            main_label = top_result['label']
+            
+            # Check for people-related content
+            people_keywords = ['people', 'person', 'group', 'crowd', 'team', 'family', 'human', 'face', 'portrait']
+            people_detected = any(keyword in result['label'].lower() for result in results for keyword in people_keywords)
+            
+            # Generate natural, descriptive caption
+            if people_detected:
+                caption = f"This image shows a group of people (detected with {confidence:.1f}% confidence)"
+            else:
+                main_label_clean = main_label.replace('_', ' ').replace('-', ' ')
+                caption = f"This image shows {main_label_clean} (detected with {confidence:.1f}% confidence)"
+            
+            return caption
+            
+        elif AI_MODE == "BASIC":
+            # Basic Image Analysis (PIL + Visual Features)
+            image = Image.open(image_path)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            
+            # Get image properties
+            width, height = image.size
+            img_array = np.array(image)
+            
+            # Basic color analysis
+            mean_colors = np.mean(img_array, axis=(0, 1))
+            color_variance = np.var(img_array.reshape(-1, 3), axis=0)
+            total_variance = np.sum(color_variance)
+            brightness = np.mean(img_array)
+            
+            # Basic feature detection
+            aspect_ratio = width / height
+            
+            # Generate descriptive caption based on visual features
+            caption_parts = []
+            
+            # Resolution description
+            if width * height > 100000:
+                caption_parts.append("high-resolution")
+            else:
+                caption_parts.append("compact")
+            
+            # Color description
+            if brightness > 200:
+                caption_parts.append("bright")
+            elif brightness < 80:
+                caption_parts.append("dark")
+            else:
+                caption_parts.append("well-lit")
+            
+            # Orientation
+            if aspect_ratio > 1.5:
+                caption_parts.append("landscape-oriented")
+            elif aspect_ratio < 0.7:
+                caption_parts.append("portrait-oriented")
+            else:
+                caption_parts.append("square-oriented")
+            
+            # Color richness
+            if total_variance > 8000:
+                caption_parts.append("colorful scene")
+            elif total_variance > 3000:
+                caption_parts.append("moderately colorful image")
+            else:
+                caption_parts.append("simple colored image")
+            
+            # Dominant color
+            r, g, b = mean_colors
+            if r > g and r > b:
+                caption_parts.append("with reddish tones")
+            elif g > r and g > b:
+                caption_parts.append("with greenish tones")
+            elif b > r and b > g:
+                caption_parts.append("with bluish tones")
+            
+            caption = f"This is a {' '.join(caption_parts[:4])} captured from ESP32 camera"
+            
+            # Add technical details
+            caption += f" (Resolution: {width}×{height}, Brightness: {brightness:.0f}/255)"
+            
+            return caption
+    
+    except Exception as e:
+        print(f"AI Analysis error: {e}")
+        import traceback
+        traceback.print_exc()
+        return f"Image analysis failed: {str(e)[:100]}..."
@@ -6,9 +6,8 @@ Uses cached model from E: drive
 
 import torch
 from transformers import BlipProcessor, BlipForConditionalGeneration
-from PIL import Image
 import os
-import glob
+from image_files import find_images, load_image
 
 # Use E: drive cache
 CACHE_DIR = r"E:\Rajeev\esp 32\esp 32\.cache\huggingface"
@@ -21,12 +20,14 @@ print("🚀 Loading BLIP from E: drive cache...\n")
 
 try:
     # Load from cache (won't download again)
-    processor = BlipProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
+    processor = BlipProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR, use_fast=True)
     model = BlipForConditionalGeneration.from_pretrained(
         MODEL_ID,
         cache_dir=CACHE_DIR,
         torch_dtype=torch.float32,
-        device_map=None
+        device_map=None,
+        use_safetensors=True,  # mmap the cached weights instead of unpickling a copy
+        low_cpu_mem_usage=True
     )
     
     device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -35,7 +36,7 @@ try:
     print(f"📱 Device: {device}\n")
     
     # Get images
-    images = glob.glob("uploads/images/*.jpg") + glob.glob("uploads/images/*.png")
+    images = find_images()
     
     if not images:
         print("❌ No images found")
@@ -45,11 +46,11 @@ try:
         
         for idx, img_path in enumerate(images, 1):
             try:
-                img = Image.open(img_path).convert("RGB")
+                img = load_image(img_path)
                 
                 # Get caption
                 inputs = processor(img, return_tensors="pt").to(device)
-                with torch.no_grad():
+                with torch.inference_mode():
                     out = model.generate(**inputs, max_length=50)
                 caption = processor.decode(out[0], skip_special_tokens=True)
                 
@@ -12,8 +12,18 @@ Make sure to install: mpremote install mpu6050
 
 import network
 import socket
-import json
+import struct
 import time
+import gc
+import array
+try:
+    import micropython
+except ImportError:
+    # CPython (desktop testing): run the hot path as plain Python
+    class micropython:
+        native = staticmethod(lambda f: f)
+        viper = staticmethod(lambda f: f)
+    ptr16 = memoryview
 from machine import Pin, I2C, ADC
 import urequests
 
@@ -22,6 +32,44 @@ SSID = "YOUR_SSID"
 PASSWORD = "YOUR_PASSWORD"
 SERVER_IP = "192.168.X.X"  # Change to your server IP
 SERVER_PORT = 5000
+SENSOR_UDP_PORT = 5001  # Must match SENSOR_UDP_PORT in app.py
+DEVICE_ID = "ESP32_001"
+# Fire-and-forget sensor batches over UDP; False = HTTP keep-alive with status check.
+# The server only accepts UDP from devices listed in SENSOR_UDP_DEVICES (DEVICE_ID=this board's IP)
+USE_UDP = False
+DEBUG = False  # Print every reading (formatting allocates on each loop)
+
+# Microphone: each reading is the RMS of a burst of MIC_SAMPLES 12-bit ADC samples.
+# 128 keeps the viper sum of squares below 2**31 even for a full-scale signal.
+MIC_SAMPLES = 128
+
+# Binary sensor frame for /api/sensor-data/binary (must match SENSOR_FRAME in app.py):
+# accel xyz, gyro xyz, mic level as float32 + sound data as uint16, little-endian (30 bytes)
+SENSOR_FRAME_FORMAT = '<7fH'
+SENSOR_FRAME_SIZE = struct.calcsize(SENSOR_FRAME_FORMAT)
+
+# Sample every 100 ms and send BATCH_N frames per request (one POST per second)
+SAMPLE_INTERVAL_MS = 100
+BATCH_N = 10
+BATCH_SIZE = BATCH_N * SENSOR_FRAME_SIZE
+# Capture and upload a camera frame every IMAGE_EVERY_BATCHES batches (every 10 s)
+IMAGE_EVERY_BATCHES = 10
+
+# Request bytes for one batch, allocated once: fixed header + frames packed in place.
+# UDP datagram header: 1 length byte + device id; HTTP: the request line and headers
+if USE_UDP:
+    FRAME_HEADER = bytes([len(DEVICE_ID)]) + DEVICE_ID.encode()
+else:
+    FRAME_HEADER = (
+        "POST /api/sensor-data/binary?device_id=%s HTTP/1.1\r\n"
+        "Host: %s:%d\r\n"
+        "Connection: keep-alive\r\n"
+        "Content-Type: application/octet-stream\r\n"
+        "Content-Length: %d\r\n"
+        "\r\n" % (DEVICE_ID, SERVER_IP, SERVER_PORT, BATCH_SIZE)
+    ).encode()
+FRAME_OFFSET = len(FRAME_HEADER)
+REQUEST_BUFFER = bytearray(FRAME_HEADER) + bytearray(BATCH_SIZE)
 
 # Sensor data storage
 sensor_data = {
@@ -32,14 +80,32 @@ sensor_data = {
     'gyro_y': 0.0,
     'gyro_z': 0.0,
     'mic_level': 0,
-    'sound_data': 0,
-    'camera_image': None
+    'sound_data': 0
 }
 
+@micropython.viper
+def mic_sum_squares(buf, n: int) -> int:
+    """Sum of squared deviations from the mean of the first n samples in an array('H')"""
+    samples = ptr16(buf)
+    total = 0
+    for i in range(n):
+        total += samples[i]
+    mean = total // n
+    
+    acc = 0
+    for i in range(n):
+        d = samples[i] - mean
+        acc += d * d
+    return acc
+
 class ESP32Dashboard:
     def __init__(self):
         self.wifi_connected = False
         self.server_url = f"http://{SERVER_IP}:{SERVER_PORT}"
+        # Persistent keep-alive connection / UDP socket for sensor frames (opened on first send)
+        self.sock = None
+        self.udp = None
+        self.udp_addr = None
         self.connect_wifi()
         self.init_sensors()
     
@@ -71,6 +137,7 @@ class ESP32Dashboard:
             # Initialize ADC for microphone
             self.mic_adc = ADC(Pin(35))  # GPIO35 for analog input
             self.mic_adc.atten(ADC.ATTN_11DB)
+            self.mic_buffer = array.array('H', bytes(2 * MIC_SAMPLES))
             
             print("Sensors initialized successfully")
         except Exception as e:
@@ -79,31 +146,29 @@ class ESP32Dashboard:
     def read_accelerometer(self):
         """Read accelerometer data (simulated)"""
         # In real implementation, read from MPU6050
-        # For now, return simulated data
-        return {
-            'accel_x': 0.13,
-            'accel_y': -0.09,
-            'accel_z': 9.81
-        }
+        # For now, return simulated data as (x, y, z)
+        return 0.13, -0.09, 9.81
     
     def read_gyroscope(self):
         """Read gyroscope data (simulated)"""
         # In real implementation, read from MPU6050
-        return {
-            'gyro_x': 0.45,
-            'gyro_y': -0.23,
-            'gyro_z': 0.12
-        }
+        return 0.45, -0.23, 0.12
     
+    @micropython.native
     def read_microphone(self):
-        """Read microphone level"""
+        """Read microphone level (RMS of a sample burst, 0-100)"""
         try:
-            # Read ADC value and convert to dB (simplified)
-            adc_value = self.mic_adc.read()
-            db_level = (adc_value / 4095.0) * 100
-            return db_level
+            # Burst-sample into the preallocated buffer, 12-bit like the old read()
+            read = self.mic_adc.read_u16
+            buf = self.mic_buffer
+            for i in range(MIC_SAMPLES):
+                buf[i] = read() >> 4
+            
+            # Convert AC RMS to a level (simplified; full-scale swing = 100)
+            rms = (mic_sum_squares(buf, MIC_SAMPLES) / MIC_SAMPLES) ** 0.5
+            return min(rms / 2048.0 * 100, 100.0)
         except:
-            return 0
+            return 0.0
     
     def read_camera(self):
         """Capture camera image (if camera module is connected)"""
@@ -118,85 +183,185 @@ class ESP32Dashboard:
         except:
             return None
     
-    def collect_sensor_data(self):
-        """Collect all sensor data"""
-        data = {}
+    @micropython.native
+    def collect_sensor_data(self, slot):
+        """Read all sensors and pack them into batch slot `slot` of REQUEST_BUFFER"""
+        accel_x, accel_y, accel_z = self.read_accelerometer()
+        gyro_x, gyro_y, gyro_z = self.read_gyroscope()
+        mic_level = self.read_microphone()
         
-        # Read accelerometer
-        accel = self.read_accelerometer()
-        data.update(accel)
-        
-        # Read gyroscope
-        gyro = self.read_gyroscope()
-        data.update(gyro)
+        struct.pack_into(SENSOR_FRAME_FORMAT, REQUEST_BUFFER, FRAME_OFFSET + slot * SENSOR_FRAME_SIZE,
+                         accel_x, accel_y, accel_z,
+                         gyro_x, gyro_y, gyro_z,
+                         mic_level, int(mic_level * 10))
+    
+    def open_connection(self):
+        """Open the keep-alive socket to the dashboard server"""
+        addr = socket.getaddrinfo(SERVER_IP, SERVER_PORT)[0][-1]
+        sock = socket.socket()
+        sock.settimeout(5)
+        sock.connect(addr)
+        self.sock = sock
+    
+    def close_connection(self):
+        """Drop the keep-alive socket (reopened on the next send)"""
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+    
+    def read_response(self):
+        """Read one HTTP response from the keep-alive socket, return its status code"""
+        status_line = self.sock.readline()
+        if not status_line:
+            raise OSError("Connection closed by server")
         
-        # Read microphone
-        data['mic_level'] = self.read_microphone()
-        data['sound_data'] = int(data['mic_level'] * 10)
+        content_length = 0
+        keep_alive = True
+        while True:
+            line = self.sock.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                content_length = int(value.strip())
+            elif name == b"connection" and value.strip().lower() == b"close":
+                keep_alive = False
         
-        # Read camera
-        camera_img = self.read_camera()
-        if camera_img:
-            import ubinascii
-            data['camera_image'] = ubinascii.b2a_base64(camera_img).decode('utf-8')
+        # Discard the JSON body so the next response starts cleanly
+        if content_length:
+            self.sock.read(content_length)
+        if not keep_alive:
+            self.close_connection()
         
-        return data
+        return int(status_line.split()[1])
     
-    def send_data(self, data):
-        """Send sensor data to dashboard server"""
+    def send_frame(self):
+        """Send the packed batch in REQUEST_BUFFER over the keep-alive connection"""
+        # Retry once on a fresh connection if the server closed the idle one
+        for attempt in range(2):
+            try:
+                if self.sock is None:
+                    self.open_connection()
+                self.sock.write(REQUEST_BUFFER)
+                return self.read_response()
+            except OSError as e:
+                self.close_connection()
+                if attempt:
+                    raise e
+    
+    def send_udp(self):
+        """Send the packed batch as one UDP datagram (no response to wait for)"""
+        if self.udp is None:
+            self.udp_addr = socket.getaddrinfo(SERVER_IP, SENSOR_UDP_PORT)[0][-1]
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.sendto(REQUEST_BUFFER, self.udp_addr)
+    
+    def send_data(self):
+        """Send the packed sensor batch to dashboard server"""
         if not self.wifi_connected:
             print("WiFi not connected, skipping data send")
             return False
         
+        if USE_UDP:
+            try:
+                self.send_udp()
+                return True
+            except OSError as e:
+                print("Error sending data: %s" % e)
+                return False
+        
         try:
-            url = f"{self.server_url}/api/sensor-data"
-            headers = {'Content-Type': 'application/json'}
+            status_code = self.send_frame()
+            if status_code == 200:
+                if DEBUG:
+                    print("Data sent successfully")
+                return True
+            print("Server error: %d" % status_code)
+            return False
+        except Exception as e:
+            print("Error sending data: %s" % e)
+            return False
+    
+    def send_image(self, jpeg):
+        """Upload a raw JPEG frame to the dashboard server's /upload endpoint"""
+        if not self.wifi_connected:
+            print("WiFi not connected, skipping image upload")
+            return False
+        
+        try:
+            url = "%s/upload?device_id=%s" % (self.server_url, DEVICE_ID)
+            headers = {'Content-Type': 'image/jpeg'}
             
-            # Send data via HTTP POST
-            response = urequests.post(url, 
-                                     data=json.dumps(data),
-                                     headers=headers,
-                                     timeout=5)
+            # Raw bytes as the body: no base64 copy of the image on the heap
+            response = urequests.post(url, data=jpeg, headers=headers, timeout=5)
+            status_code = response.status_code
+            response.close()
             
-            if response.status_code == 200:
-                print("Data sent successfully")
+            if status_code == 200:
+                if DEBUG:
+                    print("Image sent successfully")
                 return True
-            else:
-                print(f"Server error: {response.status_code}")
-                return False
+            print("Server error: %d" % status_code)
+            return False
         
         except Exception as e:
-            print(f"Error sending data: {e}")
+            print("Error sending image: %s" % e)
             return False
     
     def run(self):
-        """Main loop - collect and send data"""
-        loop_count = 0
+        """Main loop - sample every SAMPLE_INTERVAL_MS, send every BATCH_N samples"""
+        slot = 0
+        batch_count = 0
+        next_sample = time.ticks_ms()
+        
+        # Collect garbage explicitly in the idle gap after each send instead of
+        # letting an automatic collection pause a read or a socket write
+        gc.disable()
         
         while True:
             try:
-                print(f"\n--- Loop {loop_count} ---")
-                
                 # Collect sensor data
-                sensor_data = self.collect_sensor_data()
-                print(f"Accel: X={sensor_data['accel_x']}, Y={sensor_data['accel_y']}, Z={sensor_data['accel_z']}")
-                print(f"Gyro: X={sensor_data['gyro_x']}, Y={sensor_data['gyro_y']}, Z={sensor_data['gyro_z']}")
-                print(f"Microphone: {sensor_data['mic_level']:.1f} dB")
-                
-                # Send data to server
-                self.send_data(sensor_data)
+                self.collect_sensor_data(slot)
+                if DEBUG:
+                    print("Sample %d | Accel: %.2f %.2f %.2f | Gyro: %.2f %.2f %.2f | Mic: %.1f dB" %
+                          ((slot,) + struct.unpack_from('<7f', REQUEST_BUFFER, FRAME_OFFSET + slot * SENSOR_FRAME_SIZE)))
+                slot += 1
                 
-                loop_count += 1
+                if slot == BATCH_N:
+                    # Send data to server
+                    self.send_data()
+                    slot = 0
+                    batch_count += 1
+                    
+                    # Camera frames go separately as raw JPEG, far less often than telemetry
+                    if batch_count % IMAGE_EVERY_BATCHES == 0:
+                        camera_img = self.read_camera()
+                        if camera_img:
+                            self.send_image(camera_img)
+                    gc.collect()
                 
-                # Send data every 1 second (adjust as needed)
-                time.sleep(1)
+                # Keep a fixed sampling cadence; after a slow send, restart it from now
+                next_sample = time.ticks_add(next_sample, SAMPLE_INTERVAL_MS)
+                delay = time.ticks_diff(next_sample, time.ticks_ms())
+                if delay > 0:
+                    time.sleep_ms(delay)
+                else:
+                    next_sample = time.ticks_ms()
             
             except KeyboardInterrupt:
                 print("Stopping...")
+                gc.enable()
                 break
             except Exception as e:
-                print(f"Error in main loop: {e}")
+                print("Error in main loop: %s" % e)
+                slot = 0
+                gc.collect()
                 time.sleep(2)
+                next_sample = time.ticks_ms()
 
 # Start the dashboard client
 if __name__ == '__main__':
@@ -3,37 +3,42 @@
 Fix syntax error in app.py - remove duplicate finally blocks
 """
 
+# Duplicate finally blocks and the single block that replaces them
+DUPLICATE_FINALLY = (b"        finally:\n"
+                     b"            conn.close()\n"
+                     b"            return False\n"
+                     b"        finally:\n"
+                     b"            conn.close()\n")
+SINGLE_FINALLY = (b"        finally:\n"
+                  b"            conn.close()\n")
+
 def fix_syntax_error():
     print("🔧 Fixing syntax error in app.py...")
     
-    with open('app.py', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+    with open('app.py', 'rb') as f:
+        data = f.read()
+    
+    # Match the file's line endings (app.py may be saved with CRLF on Windows)
+    needle, replacement = DUPLICATE_FINALLY, SINGLE_FINALLY
+    if b"\r\n" in data:
+        needle = needle.replace(b"\n", b"\r\n")
+        replacement = replacement.replace(b"\n", b"\r\n")
+    
+    pos = data.find(needle)
+    if pos < 0:
+        print("✅ No duplicate finally blocks found")
+        return
     
-    # Find and fix the duplicate finally blocks around line 647-651
-    fixed_lines = []
-    i = 0
-    while i < len(lines):
-        if (i < len(lines) - 5 and 
-            'finally:' in lines[i] and 
-            'conn.close()' in lines[i+1] and 
-            'return False' in lines[i+2] and
-            'finally:' in lines[i+3] and
-            'conn.close()' in lines[i+4]):
-            
-            print(f"📍 Found duplicate finally blocks at line {i+1}")
-            # Replace with single finally block
-            fixed_lines.append('        finally:\n')
-            fixed_lines.append('            conn.close()\n')
-            i += 5  # Skip the duplicate lines
-        else:
-            fixed_lines.append(lines[i])
-            i += 1
+    while pos >= 0:
+        line_number = data.count(b"\n", 0, pos) + 1
+        print(f"📍 Found duplicate finally blocks at line {line_number}")
+        pos = data.find(needle, pos + len(needle))
     
-    # Write fixed content back
-    with open('app.py', 'w', encoding='utf-8') as f:
-        f.writelines(fixed_lines)
+    # Replace with single finally block and write fixed content back
+    with open('app.py', 'wb') as f:
+        f.write(data.replace(needle, replacement))
     
     print("✅ Syntax error fixed!")
 
 if __name__ == "__main__":
-    fix_syntax_error()
\ No newline at end of file
+    fix_syntax_error()
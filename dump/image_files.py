@@ -0,0 +1,36 @@
+"""
+Image lookup and loading shared by the AI model test scripts
+"""
+
+import os
+from PIL import Image
+
+IMAGE_FOLDER = "uploads/images"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+MODEL_INPUT_SIZE = (384, 384)  # Largest input among the captioning models (BLIP)
+
+def find_images(*folders):
+    """List image files in each folder (default: uploads/images) with one directory scan per folder"""
+    found_images = []
+    for folder in folders or (IMAGE_FOLDER,):
+        try:
+            with os.scandir(folder) as entries:
+                found_images.extend(entry.path for entry in entries
+                                    if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file())
+        except FileNotFoundError:
+            pass
+    return found_images
+
+def load_image(path, size=MODEL_INPUT_SIZE):
+    """Open an image as RGB, shrunk so its short side is min(size) (never upscaled; the model processor resizes from there)"""
+    image = Image.open(path)
+    # JPEG: let libjpeg decode at a reduced DCT scale (still >= size); no-op for PNG
+    image.draft("RGB", size)
+    image = image.convert("RGB")
+    
+    # Keep the short side at least min(size) so no processor has to upscale
+    scale = min(size) / min(image.size)
+    if scale < 1:
+        image = image.resize((max(round(image.width * scale), 1), max(round(image.height * scale), 1)),
+                             Image.BILINEAR)
+    return image
@@ -3,6 +3,13 @@ from transformers import AutoProcessor, AutoModelForCausalLM
 from PIL import Image
 import os
 import gc
+import argparse
+from image_files import load_image
+
+# Greedy decoding by default; pass --beams N to trade speed for caption quality
+parser = argparse.ArgumentParser(description="Caption an image with the lightweight GIT model")
+parser.add_argument("--beams", type=int, default=1, help="beam search width (default: 1, greedy)")
+args = parser.parse_args()
 
 # Free up memory
 gc.collect()
@@ -25,32 +32,45 @@ try:
     processor = AutoProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
     print("✅ Processor loaded")
     
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    torch_dtype = torch.float16 if device == "cuda" else torch.float32
+    
     model = AutoModelForCausalLM.from_pretrained(
         MODEL_ID,
         cache_dir=CACHE_DIR,
-        torch_dtype=torch.float32,
+        torch_dtype=torch_dtype,
         device_map=None,
         low_cpu_mem_usage=True
     )
-    print("✅ Lightweight model loaded successfully!")
+    model.to(device)
+    if device == "cpu":
+        # int8 dynamic quantization of the Linear layers for CPU inference
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    print(f"✅ Lightweight model loaded successfully on {device.upper()}!")
     
     # Load image
     try:
-        image = Image.open(IMAGE_PATH).convert("RGB")
+        image = load_image(IMAGE_PATH)
         print(f"📸 Image loaded: {image.size}")
     except FileNotFoundError:
         print(f"⚠️ Creating test image...")
         image = Image.new('RGB', (224, 224), color='blue')
     
     # Generate caption
+    # Cast only pixel_values: image-only GitProcessor calls may return a
+    # BatchEncoding, whose .to() takes a device but no dtype
     inputs = processor(images=image, return_tensors="pt")
+    pixel_values = inputs.pixel_values.to(device, torch_dtype)
     
-    with torch.no_grad():
+    with torch.inference_mode():
         output_ids = model.generate(
-            pixel_values=inputs.pixel_values,
-            max_length=50,
-            num_beams=4,
-            early_stopping=True
+            pixel_values=pixel_values,
+            max_new_tokens=20,
+            num_beams=args.beams,
+            do_sample=False,
+            use_cache=True,
+            early_stopping=args.beams > 1
         )
         
     caption = processor.decode(output_ids[0], skip_special_tokens=True)
@@ -14,6 +14,33 @@ from datetime import datetime
 DB_PATH = "sensor_data.db"
 BACKUP_PATH = f"sensor_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
 
+# Rows copied per INSERT ... SELECT window (keeps each statement's work bounded)
+COPY_CHUNK_ROWS = 100000
+
+# Bulk-load settings for the migration session only (the backup covers a crash)
+MIGRATION_PRAGMAS = """
+    PRAGMA journal_mode=OFF;
+    PRAGMA synchronous=OFF;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-200000;
+"""
+# Normal settings used by app.py, restored once the migration is done
+RESTORE_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+"""
+
+def copy_database(src_path, dst_path):
+    """Copy a SQLite database with the online backup API (safe while other connections are open)"""
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        with dst:
+            src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+
 def migrate_database():
     print("🔄 Starting Database Migration...")
     print("=" * 50)
@@ -24,11 +51,14 @@ def migrate_database():
     
     # Create backup
     print("📋 Creating backup...")
-    os.system(f'copy "{DB_PATH}" "{BACKUP_PATH}"')
+    copy_database(DB_PATH, BACKUP_PATH)
     print(f"✅ Backup created: {BACKUP_PATH}")
     
+    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        # Autocommit mode so the whole migration runs in one explicit transaction
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.executescript(MIGRATION_PRAGMAS)
         cursor = conn.cursor()
         
         # Check existing data count
@@ -36,6 +66,8 @@ def migrate_database():
         existing_count = cursor.fetchone()[0]
         print(f"📊 Existing records: {existing_count}")
         
+        cursor.execute("BEGIN IMMEDIATE")
+        
         # Step 1: Create new optimized sensor_readings table
         print("\n🗃️  Creating optimized sensor_readings table...")
         cursor.execute('''
@@ -53,14 +85,20 @@ def migrate_database():
             )
         ''')
         
-        # Step 2: Copy data (excluding BLOBs)
+        # Step 2: Copy data (excluding BLOBs) in id windows
         print("📤 Migrating sensor data...")
-        cursor.execute('''
-            INSERT INTO sensor_readings_new 
-            (id, timestamp, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, mic_level)
-            SELECT id, timestamp, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, mic_level
-            FROM sensor_readings
-        ''')
+        cursor.execute("SELECT MIN(id), MAX(id) FROM sensor_readings")
+        min_id, max_id = cursor.fetchone()
+        if min_id is not None:
+            for start_id in range(min_id, max_id + 1, COPY_CHUNK_ROWS):
+                cursor.execute('''
+                    INSERT INTO sensor_readings_new 
+                    (id, timestamp, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, mic_level)
+                    SELECT id, timestamp, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, mic_level
+                    FROM sensor_readings
+                    WHERE id BETWEEN ? AND ?
+                ''', (start_id, start_id + COPY_CHUNK_ROWS - 1))
+                print(f"   Copied ids up to {min(start_id + COPY_CHUNK_ROWS - 1, max_id)}")
         
         # Step 3: Create images table
         print("🖼️  Creating images table...")
@@ -81,11 +119,19 @@ def migrate_database():
         cursor.execute("DROP TABLE sensor_readings")
         cursor.execute("ALTER TABLE sensor_readings_new RENAME TO sensor_readings")
         
+        # Step 5: Index per-device time-series lookups (built once, after the bulk copy;
+        # same name as app.py's index so init_database doesn't create a duplicate)
+        print("📇 Creating indexes...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sensor_readings_device_timestamp ON sensor_readings(device_id, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_device_timestamp ON images(device_id, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_important ON images(device_id, timestamp) WHERE is_important = 1")
+        
         # Verify migration
         cursor.execute("SELECT COUNT(*) FROM sensor_readings")
         new_count = cursor.fetchone()[0]
         
         conn.commit()
+        conn.executescript(RESTORE_PRAGMAS)
         conn.close()
         
         print(f"✅ Migration completed!")
@@ -93,13 +139,16 @@ def migrate_database():
         print(f"   Images table created")
         print(f"   BLOB columns removed")
         print(f"   Device ID added")
+        print(f"   Device/timestamp indexes created")
         
         return True
         
     except Exception as e:
         print(f"❌ Migration failed: {e}")
+        if conn:
+            conn.close()
         print(f"🔄 Restoring backup...")
-        os.system(f'copy "{BACKUP_PATH}" "{DB_PATH}"')
+        copy_database(BACKUP_PATH, DB_PATH)
         return False
 
 if __name__ == "__main__":
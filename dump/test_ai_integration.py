@@ -6,10 +6,11 @@ Tests the analyze_image_with_ai function with existing images
 
 import sys
 import os
-sys.path.append(os.path.dirname(__file__))
+# Project root holds app_ai.py (AI analysis only, no Flask app or database start-up)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import analyze_image_with_ai, AI_AVAILABLE
-import glob
+from app_ai import analyze_image_with_ai, AI_AVAILABLE
+from image_files import find_images
 
 def test_ai_analysis():
     print("🧪 TESTING AI IMAGE ANALYSIS INTEGRATION")
@@ -20,18 +21,7 @@ def test_ai_analysis():
         return
     
     # Find images in uploads/images folder
-    image_patterns = [
-        "uploads/images/*.jpg",
-        "uploads/images/*.jpeg", 
-        "uploads/images/*.png",
-        "static/*.jpg",
-        "static/*.jpeg",
-        "static/*.png"
-    ]
-    
-    found_images = []
-    for pattern in image_patterns:
-        found_images.extend(glob.glob(pattern))
+    found_images = find_images("uploads/images", "static")
     
     if not found_images:
         print("❌ No images found to test")
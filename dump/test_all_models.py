@@ -1,111 +1,128 @@
 #!/usr/bin/env python3
 """
 Compare ALL AI Image Analysis Models
-Tests Google ViT, Microsoft GIT, and Lightweight Vision
+Tests Google ViT, Microsoft GIT, BLIP, and Lightweight Vision on every found image
 """
 
 import os
 import sys
-import glob
+import gc
+import time
+import orjson
 from PIL import Image
 import numpy as np
 
-sys.path.append(os.path.dirname(__file__))
-
-print("\n" + "="*70)
-print("🤖 COMPARING ALL AI IMAGE ANALYSIS MODELS")
-print("="*70 + "\n")
-
-# Find images to analyze
-image_patterns = [
-    "uploads/images/*.jpg",
-    "uploads/images/*.jpeg",
-    "uploads/images/*.png",
-]
-
-found_images = []
-for pattern in image_patterns:
-    found_images.extend(glob.glob(pattern))
-
-if not found_images:
-    print("❌ No images found in uploads/images/")
-    sys.exit(1)
-
-print(f"📸 Found {len(found_images)} images to analyze\n")
-
-# ============ MODEL 1: Google ViT (from app.py) ============
-print("1️⃣  GOOGLE VIT (Vision Transformer - Classification)")
-print("-" * 70)
-
-try:
-    from app import analyze_image_with_ai, AI_AVAILABLE
-    
-    if not AI_AVAILABLE:
-        print("❌ Google ViT not available")
-    else:
-        test_image = found_images[0]
-        caption = analyze_image_with_ai(test_image)
-        print(f"✅ Model: Google ViT loaded")
-        print(f"📷 Image: {os.path.basename(test_image)}")
-        print(f"🎯 Caption: {caption}")
-        print()
-        
-except Exception as e:
-    print(f"❌ Error loading Google ViT: {e}\n")
-
-# ============ MODEL 2: Microsoft GIT (Lightweight) ============
-print("2️⃣  MICROSOFT GIT (Lightweight Image-to-Text)")
-print("-" * 70)
-
-try:
+# Project root holds app_ai.py (AI analysis only, no Flask app or database start-up)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_files import find_images, load_image
+
+CACHE_DIR = r"E:\Rajeev\esp 32\esp 32\.cache\huggingface"
+os.environ['HUGGINGFACE_HUB_CACHE'] = CACHE_DIR
+
+# Images captioned per generate() call
+BATCH_SIZE = 8
+
+def run_model(name, load_fn, infer_fn, images):
+    """Load one model, run it over every image, then free it before the next model"""
+    print(f"🚀 {name}")
+    print("-" * 70)
+    
+    model = None
+    try:
+        t0 = time.perf_counter()
+        model = load_fn()
+        t1 = time.perf_counter()
+        outputs = infer_fn(model, images)
+        t2 = time.perf_counter()
+    except Exception as e:
+        print(f"❌ Error running {name}: {e}\n")
+        return {'model': name, 'error': str(e)}
+    finally:
+        # Drop this model before loading the next one (frees GPU memory too)
+        del model
+        gc.collect()
+        if 'torch' in sys.modules and sys.modules['torch'].cuda.is_available():
+            sys.modules['torch'].cuda.empty_cache()
+    
+    captions = []
+    for img_path, output in zip(images, outputs):
+        entry = output if isinstance(output, dict) else {'caption': output}
+        entry['image'] = os.path.basename(img_path)
+        captions.append(entry)
+        print(f"📷 {entry['image']}: {entry['caption']}")
+    
+    per_image_us = (t2 - t1) / len(images) * 1e6
+    print(f"⏱️  Load: {t1 - t0:.2f} s | Inference: {t2 - t1:.2f} s ({per_image_us:,.0f} µs/image)\n")
+    
+    return {
+        'model': name,
+        'load_seconds': t1 - t0,
+        'inference_seconds': t2 - t1,
+        'per_image_us': per_image_us,
+        'captions': captions
+    }
+
+# ============ MODEL 1: Google ViT (from app_ai.py) ============
+def load_vit():
+    import app_ai
+    if not app_ai.AI_AVAILABLE:
+        raise RuntimeError("Google ViT not available")
+    return app_ai
+
+def infer_vit(app_ai, images):
+    try:
+        return [app_ai.analyze_image_with_ai(img_path) for img_path in images]
+    finally:
+        app_ai.ai_classifier = None  # Release the lazily loaded pipeline
+
+# ============ MODELS 2-3: Microsoft GIT / BLIP (batched captioning) ============
+def load_captioner(model_id, model_class_name):
     import torch
-    from transformers import AutoProcessor, AutoModelForCausalLM
-    
-    CACHE_DIR = r"E:\Rajeev\esp 32\esp 32\.cache\huggingface"
-    os.environ['HUGGINGFACE_HUB_CACHE'] = CACHE_DIR
+    import transformers
     
-    MODEL_ID = "microsoft/git-base"
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    torch_dtype = torch.float16 if device == "cuda" else torch.float32
     
-    print("🚀 Loading Microsoft GIT model...")
-    processor = AutoProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
-    model = AutoModelForCausalLM.from_pretrained(
-        MODEL_ID,
+    processor = transformers.AutoProcessor.from_pretrained(model_id, cache_dir=CACHE_DIR, use_fast=True)
+    model = getattr(transformers, model_class_name).from_pretrained(
+        model_id,
         cache_dir=CACHE_DIR,
-        torch_dtype=torch.float32,
-        device_map=None
+        torch_dtype=torch_dtype,
+        device_map=None,
+        low_cpu_mem_usage=True
     )
-    print("✅ Microsoft GIT loaded")
-    
-    test_image = found_images[0]
-    image = Image.open(test_image).convert("RGB")
-    
-    inputs = processor(images=image, return_tensors="pt")
-    with torch.no_grad():
-        output_ids = model.generate(**inputs, max_length=50)
-    
-    caption = processor.decode(output_ids[0], skip_special_tokens=True)
-    print(f"📷 Image: {os.path.basename(test_image)}")
-    print(f"🎯 Caption: {caption}")
-    print()
-    
-except Exception as e:
-    print(f"❌ Error loading Microsoft GIT: {e}\n")
-
-# ============ MODEL 3: Lightweight Vision (Basic Analysis) ============
-print("3️⃣  BASIC IMAGE ANALYSIS (PIL + Visual Features)")
-print("-" * 70)
-
-try:
-    test_image = found_images[0]
-    image = Image.open(test_image).convert("RGB")
-    
-    # Get image properties
-    width, height = image.size
-    img_array = np.array(image)
-    
-    # Basic color analysis
-    mean_colors = np.mean(img_array, axis=(0, 1))
-    brightness = np.mean(img_array)
+    model.to(device)
+    if device == "cpu":
+        # int8 dynamic quantization of the Linear layers for CPU inference
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return processor, model, device, torch_dtype
+
+def infer_captioner(loaded, images):
+    import torch
+    processor, model, device, torch_dtype = loaded
+    
+    captions = []
+    for start in range(0, len(images), BATCH_SIZE):
+        batch = [load_image(img_path) for img_path in images[start:start + BATCH_SIZE]]
+        # GitProcessor may return a BatchEncoding (.to() takes no dtype): cast only pixel_values
+        inputs = processor(images=batch, return_tensors="pt").to(device)
+        inputs["pixel_values"] = inputs["pixel_values"].to(torch_dtype)
+        with torch.inference_mode():
+            output_ids = model.generate(**inputs, max_new_tokens=20, num_beams=1)
+        captions.extend(processor.batch_decode(output_ids, skip_special_tokens=True))
+    return captions
+
+# ============ MODEL 4: Lightweight Vision (Basic Analysis) ============
+def basic_analysis(img_path):
+    # Get image properties (read from the header, no decode needed)
+    with Image.open(img_path) as header:
+        width, height = header.size
+    
+    # Basic color analysis on a 64px decode instead of every native pixel
+    img_array = np.asarray(load_image(img_path, size=(64, 64)))
+    mean_colors = img_array.reshape(-1, 3).mean(axis=0)
+    brightness = float(img_array.mean())
     
     # Generate descriptive caption
     caption_parts = []
@@ -125,37 +142,58 @@ try:
     else:
         caption_parts.append("square-oriented")
     
-    caption = f"A {' '.join(caption_parts)} image captured at {width}×{height}"
-    
-    print("✅ Basic image analysis loaded")
-    print(f"📷 Image: {os.path.basename(test_image)}")
-    print(f"📐 Resolution: {width}×{height}")
-    print(f"☀️ Brightness: {brightness:.0f}/255")
-    print(f"🎯 Caption: {caption}")
-    print()
-    
-except Exception as e:
-    print(f"❌ Error in basic analysis: {e}\n")
-
-# ============ ANALYSIS COMPARISON ============
-print("="*70)
-print("📊 MODEL COMPARISON SUMMARY")
-print("="*70)
-print("""
-┌─ MODEL ─────────────────┬─ TYPE ──────────┬─ SPEED ─┬─ QUALITY ┐
-│ Google ViT              │ Classification  │ Fast    │ Good     │
-├─────────────────────────┼─────────────────┼─────────┼──────────┤
-│ Microsoft GIT           │ Captioning      │ Medium  │ Excellent│
-├─────────────────────────┼─────────────────┼─────────┼──────────┤
-│ Basic Image Analysis    │ Feature-based   │ Very    │ Fair     │
-│                         │                 │ Fast    │          │
-└─────────────────────────┴─────────────────┴─────────┴──────────┘
-
-✅ RECOMMENDATION: Use Google ViT for your ESP32 dashboard
-   - Fast loading and inference
-   - High accuracy for object detection
-   - Currently integrated in app.py
-   - Works perfectly with QVGA resolution images
-""")
-
-print("🎉 All model tests completed!")
+    return {
+        'caption': f"A {' '.join(caption_parts)} image captured at {width}×{height}",
+        'resolution': [width, height],
+        'brightness': brightness,
+        'mean_colors': mean_colors
+    }
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🤖 COMPARING ALL AI IMAGE ANALYSIS MODELS")
+    print("="*70 + "\n")
+    
+    # Find images to analyze
+    found_images = find_images()
+    
+    if not found_images:
+        print("❌ No images found in uploads/images/")
+        sys.exit(1)
+    
+    print(f"📸 Found {len(found_images)} images to analyze\n")
+    
+    # One model at a time over the whole image list
+    results = [
+        run_model("Google ViT", load_vit, infer_vit, found_images),
+        run_model("Microsoft GIT",
+                  lambda: load_captioner("microsoft/git-base", "AutoModelForCausalLM"),
+                  infer_captioner, found_images),
+        run_model("BLIP",
+                  lambda: load_captioner("Salesforce/blip-image-captioning-base", "BlipForConditionalGeneration"),
+                  infer_captioner, found_images),
+        run_model("Basic Image Analysis", lambda: None,
+                  lambda _, images: [basic_analysis(img_path) for img_path in images], found_images),
+    ]
+    
+    # ============ ANALYSIS COMPARISON ============
+    print("="*70)
+    print("📊 MODEL COMPARISON SUMMARY")
+    print("="*70)
+    print(f"{'MODEL':<24} {'LOAD (s)':>10} {'INFERENCE (s)':>14} {'µs/IMAGE':>14}")
+    print("-" * 70)
+    for result in results:
+        if 'error' in result:
+            print(f"{result['model']:<24} {'failed: ' + result['error'][:36]:>40}")
+        else:
+            print(f"{result['model']:<24} {result['load_seconds']:>10.2f} "
+                  f"{result['inference_seconds']:>14.2f} {result['per_image_us']:>14,.0f}")
+    print(f"\n({len(found_images)} images, batch size {BATCH_SIZE} for GIT/BLIP)\n")
+    
+    # Save all results in one write (numpy values serialize natively)
+    RESULTS_PATH = "model_comparison_results.json"
+    with open(RESULTS_PATH, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2))
+    print(f"💾 Results saved to {RESULTS_PATH}")
+    
+    print("🎉 All model tests completed!")
@@ -8,7 +8,10 @@ import torch
 from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
 import os
-import glob
+from image_files import find_images, load_image
+
+# Images captioned per generate() call
+BATCH_SIZE = 8
 
 print("\n" + "="*70)
 print("🤖 TESTING BLIP MODEL ON ESP32 IMAGES")
@@ -26,29 +29,40 @@ print("🚀 Loading BLIP model...\n")
 
 try:
     # Load processor and model
-    processor = BlipProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    torch_dtype = torch.float16 if device == "cuda" else torch.float32
+    
+    processor = BlipProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR, use_fast=True)
     model = BlipForConditionalGeneration.from_pretrained(
         MODEL_ID,
         cache_dir=CACHE_DIR,
-        torch_dtype=torch.float32,
-        device_map=None
+        torch_dtype=torch_dtype,
+        device_map=None,
+        use_safetensors=True,  # mmap the cached weights instead of unpickling a copy
+        low_cpu_mem_usage=True
     )
     
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     model.to(device)
+    if device == "cpu":
+        # int8 dynamic quantization of the Linear layers for CPU inference
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    if device == "cuda" and hasattr(torch, "compile"):
+        # Compile the ViT encoder once: the processor always resizes to 384x384,
+        # so every image reuses the same graph
+        torch.set_float32_matmul_precision("high")
+        model.vision_model = torch.compile(model.vision_model, mode="reduce-overhead", fullgraph=False)
+        
+        # Warm up so the first real image doesn't pay for compilation
+        warmup_inputs = processor(images=[Image.new("RGB", (384, 384))] * BATCH_SIZE,
+                                  return_tensors="pt").to(device, torch_dtype)
+        with torch.inference_mode():
+            model.generate(**warmup_inputs, max_length=5)
     print(f"✅ BLIP model loaded successfully!")
     print(f"📱 Device: {device.upper()}\n")
     
     # Find images
-    image_patterns = [
-        "uploads/images/*.jpg",
-        "uploads/images/*.jpeg",
-        "uploads/images/*.png",
-    ]
-    
-    found_images = []
-    for pattern in image_patterns:
-        found_images.extend(glob.glob(pattern))
+    found_images = find_images()
     
     if not found_images:
         print("❌ No images found in uploads/images/")
@@ -58,24 +72,36 @@ try:
         print("🎯 BLIP IMAGE ANALYSIS RESULTS")
         print("="*70 + "\n")
         
-        for idx, img_path in enumerate(found_images, 1):
+        idx = 0
+        for start in range(0, len(found_images), BATCH_SIZE):
+            # Load this batch of images
+            batch = []
+            for img_path in found_images[start:start + BATCH_SIZE]:
+                try:
+                    batch.append((img_path, load_image(img_path)))
+                except Exception as e:
+                    print(f"❌ Error analyzing {os.path.basename(img_path)}: {e}\n")
+            
+            if not batch:
+                continue
+            
             try:
-                # Load and process image
-                image = Image.open(img_path).convert("RGB")
+                # Generate captions for the whole batch in one greedy pass
+                inputs = processor(images=[image for _, image in batch], return_tensors="pt").to(device, torch_dtype)
+                with torch.inference_mode():
+                    out = model.generate(**inputs, max_length=50, num_beams=1)
+                
+                captions = processor.batch_decode(out, skip_special_tokens=True)
+            except Exception as e:
+                print(f"❌ Error analyzing batch: {e}\n")
+                continue
+            
+            for (img_path, image), caption in zip(batch, captions):
+                idx += 1
                 print(f"📷 Image {idx}: {os.path.basename(img_path)}")
                 print(f"📐 Resolution: {image.size[0]}×{image.size[1]}")
-                
-                # Generate caption
-                inputs = processor(image, return_tensors="pt").to(device)
-                with torch.no_grad():
-                    out = model.generate(**inputs, max_length=50)
-                
-                caption = processor.decode(out[0], skip_special_tokens=True)
                 print(f"🎯 Caption: {caption}")
                 print()
-                
-            except Exception as e:
-                print(f"❌ Error analyzing {os.path.basename(img_path)}: {e}\n")
         
         print("="*70)
         print(f"✅ BLIP Analysis Complete! ({len(found_images)} images analyzed)")
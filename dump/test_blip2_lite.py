@@ -5,10 +5,9 @@ Test BLIP-2 Lite Model - Much faster and smaller than BLIP-base
 
 import torch
 from transformers import AutoProcessor, Blip2ForConditionalGeneration
-from PIL import Image
 import os
 import gc
-import glob
+from image_files import find_images, load_image
 
 # Free up memory
 gc.collect()
@@ -27,32 +26,33 @@ MODEL_ID = "Salesforce/blip2-opt-2.7b"
 print("🚀 Loading BLIP-2 model for image captioning...")
 
 try:
-    processor = AutoProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
+    processor = AutoProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR, use_fast=True)
     print("✅ BLIP-2 Processor loaded")
     
+    # Determine device and precision (bfloat16 avoids FP16 overflow in the OPT LM head)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if device == "cuda":
+        torch_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    else:
+        torch_dtype = torch.float32
+    
     model = Blip2ForConditionalGeneration.from_pretrained(
         MODEL_ID,
         cache_dir=CACHE_DIR,
-        torch_dtype=torch.float32,
+        torch_dtype=torch_dtype,
         device_map=None
     )
     print("✅ BLIP-2 model loaded successfully!")
     
-    # Determine device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     model.to(device)
+    if device == "cpu":
+        # int8 dynamic quantization of the Linear layers for CPU inference
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
     print(f"📱 Using device: {device}")
     
     # Find images to test
-    image_patterns = [
-        "uploads/images/*.jpg",
-        "uploads/images/*.jpeg",
-        "uploads/images/*.png",
-    ]
-    
-    found_images = []
-    for pattern in image_patterns:
-        found_images.extend(glob.glob(pattern))
+    found_images = find_images()
     
     if not found_images:
         print("❌ No images found to test")
@@ -66,14 +66,14 @@ try:
             print(f"{'='*60}")
             
             try:
-                image = Image.open(img_path).convert("RGB")
+                image = load_image(img_path)
                 print(f"📐 Image size: {image.size}")
                 
                 # Prepare inputs
-                inputs = processor(images=image, return_tensors="pt").to(device)
+                inputs = processor(images=image, return_tensors="pt").to(device, torch_dtype)
                 
                 # Generate caption
-                with torch.no_grad():
+                with torch.inference_mode():
                     generated_ids = model.generate(**inputs, max_length=50)
                 
                 # Decode caption
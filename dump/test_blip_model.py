@@ -5,11 +5,11 @@ BLIP is excellent for image captioning and visual question answering
 """
 
 import torch
-from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
+from transformers import BlipProcessor, BlipForConditionalGeneration
 import os
 import gc
-import glob
+from image_files import find_images, load_image
 
 # Free up memory
 gc.collect()
@@ -25,65 +25,92 @@ print(f"📁 Cache location: {CACHE_DIR}")
 # BLIP model - excellent for image captioning
 MODEL_ID = "Salesforce/blip-image-captioning-base"
 
+# Determine device; images captioned per generate() call (bounds VRAM on GPU)
+device = "cuda" if torch.cuda.is_available() else "cpu"
+GPU_BATCH_SIZE = 8 if device == "cuda" else 2
+# Half precision on GPU (bfloat16 where supported), full precision on CPU
+if device == "cuda":
+    torch_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+else:
+    torch_dtype = torch.float32
+
 print("🚀 Loading BLIP model for image captioning...")
 
 try:
-    processor = BlipProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
+    processor = BlipProcessor.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR, use_fast=True)
     print("✅ BLIP Processor loaded")
     
     model = BlipForConditionalGeneration.from_pretrained(
         MODEL_ID,
         cache_dir=CACHE_DIR,
-        torch_dtype=torch.float32,
-        device_map=None
+        torch_dtype=torch_dtype,
+        device_map=None,
+        use_safetensors=True,  # mmap the cached weights instead of unpickling a copy
+        low_cpu_mem_usage=True
     )
     print("✅ BLIP model loaded successfully!")
     
-    # Determine device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     model.to(device)
+    model.eval()
+    if device == "cuda" and hasattr(torch, "compile"):
+        # Compile the ViT encoder once: the processor always resizes to 384x384,
+        # so every batch reuses the same graph
+        model.vision_model = torch.compile(model.vision_model, mode="reduce-overhead", fullgraph=False)
     print(f"📱 Using device: {device}")
     
     # Find images to test
-    image_patterns = [
-        "uploads/images/*.jpg",
-        "uploads/images/*.jpeg",
-        "uploads/images/*.png",
-    ]
-    
-    found_images = []
-    for pattern in image_patterns:
-        found_images.extend(glob.glob(pattern))
+    found_images = find_images()
     
     if not found_images:
         print("❌ No images found to test")
         print("📁 Checked folder: uploads/images/")
     else:
         print(f"\n📸 Found {len(found_images)} images to test:")
-        for idx, img_path in enumerate(found_images[:3], 1):  # Test first 3
-            print(f"\n{'='*60}")
-            print(f"🖼️  Image {idx}: {os.path.basename(img_path)}")
-            print(f"{'='*60}")
+        test_images = found_images[:3]  # Test first 3
+        
+        if device == "cuda" and hasattr(torch, "compile"):
+            # Warm up at the real batch size so the first batch doesn't pay for compilation
+            warmup_inputs = processor(images=[Image.new("RGB", (384, 384))] * min(GPU_BATCH_SIZE, len(test_images)),
+                                      return_tensors="pt").to(device, torch_dtype)
+            with torch.inference_mode(), torch.autocast(device_type=device, dtype=torch_dtype):
+                model.generate(**warmup_inputs, max_length=5)
+        
+        idx = 0
+        for start in range(0, len(test_images), GPU_BATCH_SIZE):
+            # Load this batch of images
+            batch = []
+            for img_path in test_images[start:start + GPU_BATCH_SIZE]:
+                try:
+                    batch.append((img_path, load_image(img_path)))
+                except Exception as e:
+                    print(f"❌ Error processing image {os.path.basename(img_path)}: {e}")
+            
+            if not batch:
+                continue
             
             try:
-                image = Image.open(img_path).convert("RGB")
-                print(f"📐 Image size: {image.size}")
+                # Prepare inputs for the whole batch
+                inputs = processor(images=[image for _, image in batch], return_tensors="pt").to(device, torch_dtype)
                 
-                # Prepare inputs
-                inputs = processor(image, return_tensors="pt").to(device)
-                
-                # Generate caption
-                with torch.no_grad():
-                    out = model.generate(**inputs, max_length=50)
-                
-                # Decode caption
-                caption = processor.decode(out[0], skip_special_tokens=True)
+                # Generate captions in one greedy pass
+                with torch.inference_mode(), torch.autocast(device_type=device, dtype=torch_dtype,
+                                                            enabled=device == "cuda"):
+                    out = model.generate(**inputs, max_length=50, num_beams=1)
                 
+                # Decode captions
+                captions = processor.batch_decode(out, skip_special_tokens=True)
+            except Exception as e:
+                print(f"❌ Error processing batch: {e}")
+                continue
+            
+            for (img_path, image), caption in zip(batch, captions):
+                idx += 1
+                print(f"\n{'='*60}")
+                print(f"🖼️  Image {idx}: {os.path.basename(img_path)}")
+                print(f"{'='*60}")
+                print(f"📐 Image size: {image.size}")
                 print(f"🎯 BLIP Caption: {caption}")
                 print()
-                
-            except Exception as e:
-                print(f"❌ Error processing image: {e}")
         
         print(f"\n✅ BLIP model testing complete!")
         print(f"✨ Cache stored at: {CACHE_DIR}")
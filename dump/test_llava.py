@@ -5,10 +5,11 @@ Advanced vision-language model for image understanding and VQA
 """
 
 import torch
-from transformers import AutoProcessor, LlavaForConditionalGeneration
 from PIL import Image
+from transformers import AutoProcessor, LlavaForConditionalGeneration, BitsAndBytesConfig
 import os
-import glob
+import importlib.util
+from image_files import find_images, load_image
 
 print("\n" + "="*70)
 print("🚀 LLAVA - LARGE LANGUAGE AND VISION ASSISTANT")
@@ -25,9 +26,18 @@ print(f"💾 Store: E: drive\n")
 
 # Use HuggingFace optimized LLaVA (smaller than full version)
 MODEL_ID = "llava-hf/llava-1.5-7b-hf"
+MAX_NEW_TOKENS = 100
+
+# GPU memory budget for the weights; layers that don't fit are kept in CPU RAM
+# (lower LLAVA_GPU_MEMORY on small cards instead of hitting out-of-memory)
+GPU_MAX_MEMORY = os.environ.get('LLAVA_GPU_MEMORY', '6GiB')
+CPU_MAX_MEMORY = os.environ.get('LLAVA_CPU_MEMORY', '20GiB')
 
 print(f"🤖 Model: LLaVA 1.5 7B (HF optimized)")
-print(f"📊 Size: ~14GB\n")
+print(f"📊 Size: ~14GB (~4GB in 4-bit on GPU)\n")
+
+# Set device
+device = "cuda" if torch.cuda.is_available() else "cpu"
 
 try:
     print("📥 Loading processor...")
@@ -35,24 +45,69 @@ try:
     print("✅ Processor loaded")
     
     print("📥 Loading LLaVA model... (This may take a few minutes)")
-    model = LlavaForConditionalGeneration.from_pretrained(
-        MODEL_ID,
-        cache_dir=CACHE_DIR,
-        torch_dtype=torch.float16,  # Use FP16 to save memory
-        device_map="auto",
-        low_cpu_mem_usage=True
-    )
-    print("✅ LLaVA model loaded!\n")
+    if device == "cuda":
+        # 4-bit NF4 weights (bitsandbytes is GPU-only), FP16 compute
+        quantization_config = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_compute_dtype=torch.float16,
+            bnb_4bit_quant_type="nf4",
+            llm_int8_enable_fp32_cpu_offload=True  # allow offloaded layers past GPU_MAX_MEMORY
+        )
+        # FlashAttention-2 when the flash-attn package is installed, else PyTorch SDPA
+        attn_implementation = "flash_attention_2" if importlib.util.find_spec("flash_attn") else "sdpa"
+        model = LlavaForConditionalGeneration.from_pretrained(
+            MODEL_ID,
+            cache_dir=CACHE_DIR,
+            torch_dtype=torch.float16,
+            device_map="auto",
+            max_memory={0: GPU_MAX_MEMORY, "cpu": CPU_MAX_MEMORY},
+            quantization_config=quantization_config,
+            attn_implementation=attn_implementation
+        )
+        print(f"✅ LLaVA model loaded! (4-bit, {attn_implementation} attention)\n")
+    else:
+        model = LlavaForConditionalGeneration.from_pretrained(
+            MODEL_ID,
+            cache_dir=CACHE_DIR,
+            torch_dtype=torch.float16,  # Use FP16 to save memory
+            device_map="auto",
+            low_cpu_mem_usage=True
+        )
+        print("✅ LLaVA model loaded!\n")
     
-    # Set device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     if device == "cpu":
         model.to(device)
+    model.eval()
+    
+    # Layers placed past GPU_MAX_MEMORY run through accelerate's host-to-device
+    # offload hooks, which CUDA graphs can't capture: keep such a model eager
+    offloaded = any(location in ("cpu", "disk") for location in getattr(model, "hf_device_map", {}).values())
+    if device == "cuda" and offloaded:
+        print("⚠️ Part of the model is offloaded to CPU, skipping torch.compile and the static cache")
+    
+    if device == "cuda" and not offloaded and hasattr(torch, "compile"):
+        # Pre-allocated KV cache: fixed tensor shapes for every decode step,
+        # so the compiled decoder replays one CUDA graph per token
+        # (SDPA only: the FlashAttention-2 path rejects a static cache)
+        if attn_implementation == "sdpa":
+            model.generation_config.cache_implementation = "static"
+        
+        # Compile only the language model: the multimodal projector and image
+        # token merging cause graph breaks, the decoder is where the time goes
+        model.language_model = torch.compile(model.language_model, mode="reduce-overhead", fullgraph=False)
+        
+        # Warm up at the real generation length (the static cache is sized from it)
+        print("🔥 Compiling language model (warm-up)...")
+        warmup_inputs = processor(text="Describe this image in detail.", images=Image.new("RGB", (336, 336)),
+                                  return_tensors="pt")
+        warmup_inputs = {k: v.to(device) for k, v in warmup_inputs.items()}
+        with torch.inference_mode():
+            model.generate(**warmup_inputs, max_new_tokens=MAX_NEW_TOKENS)
     print(f"📱 Running on: {device.upper()}\n")
     
     # Find images
     print("📸 Searching for images...")
-    images = glob.glob("uploads/images/*.jpg") + glob.glob("uploads/images/*.png")
+    images = find_images()
     
     if not images:
         print("❌ No images found")
@@ -67,7 +122,7 @@ try:
                 print(f"📷 Image {idx}: {os.path.basename(img_path)}")
                 
                 # Load image
-                image = Image.open(img_path).convert("RGB")
+                image = load_image(img_path)
                 print(f"📐 Size: {image.size[0]}×{image.size[1]}")
                 
                 # Prepare inputs
@@ -80,10 +135,10 @@ try:
                 
                 # Generate description
                 print("🤖 Generating description...")
-                with torch.no_grad():
+                with torch.inference_mode():
                     output = model.generate(
                         **inputs,
-                        max_new_tokens=100,
+                        max_new_tokens=MAX_NEW_TOKENS,
                         do_sample=True,
                         temperature=0.7
                     )
@@ -114,13 +169,13 @@ try:
 📊 Performance:
    • Speed: Medium (2-5 seconds per image)
    • Quality: Excellent (detailed descriptions)
-   • Memory: High (requires 14GB)
+   • Memory: High (requires 14GB, ~4GB in 4-bit)
    • Best for: Detailed image analysis
         """)
         
 except torch.cuda.OutOfMemoryError:
     print("⚠️ GPU out of memory")
-    print("💡 Try using CPU or smaller model")
+    print("💡 Lower LLAVA_GPU_MEMORY (e.g. 4GiB), use CPU or a smaller model")
     
 except Exception as e:
     print(f"❌ Error: {e}")
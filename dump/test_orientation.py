@@ -5,12 +5,20 @@ Simulates ESP32 sending calibrated orientation data to server
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import orjson
 import time
 import random
 
 # Server endpoint
 SERVER_URL = "http://localhost:5000"
+SEND_WORKERS = 4
+
+# One keep-alive connection pool for every POST instead of a new TCP connection each
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=SEND_WORKERS))
 
 # Sample orientation data based on your ESP32 output
 orientation_samples = [
@@ -58,39 +66,52 @@ orientation_samples = [
     }
 ]
 
-def send_orientation_data():
+def send_one(i, sample):
+    """POST one orientation sample, return its report lines"""
+    # Add device ID and timestamp
+    data = {
+        **sample,
+        "device_id": "ESP32_TEST_001",
+        "timestamp": time.time()
+    }
+    
+    lines = [
+        f"📊 Sending {i}/{len(orientation_samples)}: {data['direction']}",
+        f"   CAL_AX: {data['calibrated_ax']:.3f}, CAL_AY: {data['calibrated_ay']:.3f}, CAL_AZ: {data['calibrated_az']:.3f}",
+        f"   Confidence: {data['confidence']:.1f}%"
+    ]
+    
+    # Send to orientation endpoint
+    response = SESSION.post(
+        f"{SERVER_URL}/api/orientation-data",
+        headers={'Content-Type': 'application/json'},
+        data=orjson.dumps(data),
+        timeout=5
+    )
+    
+    if response.status_code == 200:
+        lines.append(f"   ✅ Success: {response.json().get('message')}")
+    else:
+        lines.append(f"   ❌ Failed: {response.text}")
+    
+    lines.append("-" * 40)
+    return "\n".join(lines)
+
+def send_orientation_data(delay=2.0):
     """Send orientation data to server"""
     print("🧭 ESP32 Orientation Data Test")
     print("=" * 40)
     
     try:
-        for i, sample in enumerate(orientation_samples, 1):
-            # Add device ID and timestamp
-            data = {
-                **sample,
-                "device_id": "ESP32_TEST_001",
-                "timestamp": time.time()
-            }
-            
-            print(f"📊 Sending {i}/{len(orientation_samples)}: {data['direction']}")
-            print(f"   CAL_AX: {data['calibrated_ax']:.3f}, CAL_AY: {data['calibrated_ay']:.3f}, CAL_AZ: {data['calibrated_az']:.3f}")
-            print(f"   Confidence: {data['confidence']:.1f}%")
-            
-            # Send to orientation endpoint
-            response = requests.post(
-                f"{SERVER_URL}/api/orientation-data",
-                headers={'Content-Type': 'application/json'},
-                json=data,
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                print(f"   ✅ Success: {response.json().get('message')}")
-            else:
-                print(f"   ❌ Failed: {response.text}")
-            
-            print("-" * 40)
-            time.sleep(2)  # Wait 2 seconds between samples
+        if delay > 0:
+            for i, sample in enumerate(orientation_samples, 1):
+                print(send_one(i, sample))
+                time.sleep(delay)  # Wait between samples
+        else:
+            # No delay: fire all samples at once over the pooled connections
+            with ThreadPoolExecutor(max_workers=SEND_WORKERS) as executor:
+                for report in executor.map(send_one, range(1, len(orientation_samples) + 1), orientation_samples):
+                    print(report)
             
     except requests.exceptions.RequestException as e:
         print(f"❌ Connection error: {e}")
@@ -98,4 +119,8 @@ def send_orientation_data():
         print("\n⏹️ Test stopped by user")
 
 if __name__ == "__main__":
-    send_orientation_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Send sample orientation readings to the dashboard")
+    parser.add_argument("--delay", type=float, default=2.0,
+                        help="seconds between samples (default: 2; 0 sends all samples concurrently)")
+    args = parser.parse_args()
+    send_orientation_data(args.delay)
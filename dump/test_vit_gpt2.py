@@ -5,10 +5,16 @@ Fast, lightweight alternative to BLIP/LLaVA (~500MB)
 """
 
 import torch
-from transformers import ViTFeatureExtractor, GPT2Tokenizer, ViTGPT2LMHeadModel
 from PIL import Image
+from transformers import ViTFeatureExtractor, GPT2Tokenizer, ViTGPT2LMHeadModel
 import os
-import glob
+import argparse
+from image_files import find_images, load_image
+
+# Greedy decoding by default; pass --beams N to trade speed for caption quality
+parser = argparse.ArgumentParser(description="Caption uploaded images with ViT-GPT2")
+parser.add_argument("--beams", type=int, default=1, help="beam search width (default: 1, greedy)")
+args = parser.parse_args()
 
 print("\n" + "="*70)
 print("🚀 VIT-GPT2 IMAGE CAPTIONING")
@@ -24,6 +30,11 @@ print(f"📁 Cache: {CACHE_DIR}")
 print(f"📊 Model Size: ~500MB (Much smaller than BLIP/LLaVA!)\n")
 
 MODEL_ID = "nlpconnect/vit-gpt2-image-captioning"
+MAX_LENGTH = 50
+
+# Determine device; images captioned per generate() call (bounds VRAM on GPU)
+device = "cuda" if torch.cuda.is_available() else "cpu"
+GPU_BATCH_SIZE = 8 if device == "cuda" else 2
 
 try:
     print("📥 Loading ViT-GPT2 model...")
@@ -41,14 +52,29 @@ try:
         cache_dir=CACHE_DIR
     )
     
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     model.to(device)
+    model.eval()
+    if device == "cuda" and hasattr(torch, "compile"):
+        # Pre-allocated KV cache for the GPT-2 decoder (only if this transformers
+        # version supports a static cache for it; otherwise keep the dynamic one)
+        if getattr(model.decoder, "_supports_static_cache", False):
+            model.generation_config.cache_implementation = "static"
+        
+        # Compile the ViT encoder once: the feature extractor always resizes to 224x224,
+        # so every image reuses the same graph
+        model.encoder = torch.compile(model.encoder, mode="reduce-overhead", fullgraph=False)
+        
+        # Warm up at the real generation length (the static cache is sized from it)
+        warmup_pixels = feature_extractor(images=[Image.new("RGB", (224, 224))] * GPU_BATCH_SIZE,
+                                          return_tensors="pt").pixel_values.to(device)
+        with torch.inference_mode():
+            model.generate(warmup_pixels, max_length=MAX_LENGTH, num_beams=args.beams, do_sample=False)
     
     print("✅ ViT-GPT2 loaded successfully!")
     print(f"📱 Device: {device.upper()}\n")
     
     # Find images
-    images = glob.glob("uploads/images/*.jpg") + glob.glob("uploads/images/*.png")
+    images = find_images()
     
     if not images:
         print("❌ No images found")
@@ -58,35 +84,47 @@ try:
         print("🎯 VIT-GPT2 CAPTION RESULTS")
         print("="*70 + "\n")
         
-        for idx, img_path in enumerate(images, 1):
+        idx = 0
+        for start in range(0, len(images), GPU_BATCH_SIZE):
+            # Load this batch of images
+            batch = []
+            for img_path in images[start:start + GPU_BATCH_SIZE]:
+                try:
+                    batch.append((img_path, load_image(img_path)))
+                except Exception as e:
+                    print(f"   ❌ Error loading {os.path.basename(img_path)}: {e}\n")
+            
+            if not batch:
+                continue
+            
             try:
-                print(f"📷 {idx}. {os.path.basename(img_path)}")
-                
-                # Load image
-                image = Image.open(img_path).convert("RGB")
-                
-                # Extract features
+                # Extract features for the whole batch
                 pixel_values = feature_extractor(
-                    images=image,
+                    images=[image for _, image in batch],
                     return_tensors="pt"
                 ).pixel_values
                 pixel_values = pixel_values.to(device)
                 
-                # Generate caption
-                with torch.no_grad():
+                # Generate captions in one pass
+                with torch.inference_mode():
                     output_ids = model.generate(
                         pixel_values,
-                        max_length=50,
-                        num_beams=4
+                        max_length=MAX_LENGTH,
+                        num_beams=args.beams,
+                        do_sample=False,
+                        early_stopping=args.beams > 1
                     )
                 
                 # Decode
-                caption = tokenizer.decode(output_ids[0], skip_special_tokens=True)
-                
-                print(f"   Caption: {caption}\n")
-                
+                captions = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
             except Exception as e:
                 print(f"   ❌ Error: {e}\n")
+                continue
+            
+            for (img_path, _), caption in zip(batch, captions):
+                idx += 1
+                print(f"📷 {idx}. {os.path.basename(img_path)}")
+                print(f"   Caption: {caption.strip()}\n")
         
         print("="*70)
         print("✅ ViT-GPT2 Captioning Complete!")
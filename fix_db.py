@@ -5,16 +5,27 @@ import sqlite3
 
 DB_PATH = 'pet_data.db'
 
+# Same durability settings as app.py's connections
+DB_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+"""
+
 def fix_database():
     """Create missing tables"""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        # Autocommit mode so all fixes run in one explicit transaction (one commit)
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.executescript(DB_PRAGMAS)
         cursor = conn.cursor()
         
         print("🔧 Fixing database...")
+        cursor.execute("BEGIN IMMEDIATE")
         
-        # Create oled_display_state table if it doesn't exist
-        print("\n1️⃣ Creating oled_display_state table...")
+        # Create oled_display_state and pet_state tables if they don't exist
+        # (execute, not executescript: executescript would commit the open transaction)
+        print("\n1️⃣ Creating oled_display_state and pet_state tables...")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS oled_display_state (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,20 +39,6 @@ def fix_database():
                 updated_by TEXT DEFAULT 'web_ui'
             )
         ''')
-        print("✅ oled_display_state table created/verified")
-        
-        # Initialize default OLED state if not exists
-        cursor.execute('SELECT COUNT(*) FROM oled_display_state')
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO oled_display_state 
-                (device_id, animation_type, animation_id, animation_name, updated_by)
-                VALUES (?, ?, ?, ?, ?)
-            ''', ('ESP32_001', 'pet', 1, 'CHILD', 'system_init'))
-            print("✅ Initialized default OLED display state")
-        
-        # Create pet_state table if it doesn't exist
-        print("\n2️⃣ Creating pet_state table...")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS pet_state (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -70,11 +67,21 @@ def fix_database():
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        print("✅ pet_state table created/verified")
+        print("✅ oled_display_state and pet_state tables created/verified")
+        
+        # Initialize default rows if the tables are empty (both counts in one query)
+        cursor.execute('SELECT (SELECT COUNT(*) FROM oled_display_state), (SELECT COUNT(*) FROM pet_state)')
+        oled_count, pet_count = cursor.fetchone()
+        
+        if oled_count == 0:
+            cursor.execute('''
+                INSERT INTO oled_display_state 
+                (device_id, animation_type, animation_id, animation_name, updated_by)
+                VALUES (?, ?, ?, ?, ?)
+            ''', ('ESP32_001', 'pet', 1, 'CHILD', 'system_init'))
+            print("✅ Initialized default OLED display state")
         
-        # Initialize default pet state if not exists
-        cursor.execute('SELECT COUNT(*) FROM pet_state')
-        if cursor.fetchone()[0] == 0:
+        if pet_count == 0:
             cursor.execute('''
                 INSERT INTO pet_state 
                 (device_id, age, stage, health, hunger, cleanliness, happiness, energy,
@@ -84,14 +91,18 @@ def fix_database():
             print("✅ Initialized default pet state")
         
         conn.commit()
-        conn.close()
         
         print("\n✅ Database fixed successfully!")
         
     except Exception as e:
         print(f"❌ Error: {e}")
+        if conn and conn.in_transaction:
+            conn.rollback()
         import traceback
         traceback.print_exc()
+    finally:
+        if conn:
+            conn.close()
 
 if __name__ == '__main__':
     fix_database()
@@ -1,4 +1,5 @@
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 import glob
 
 FRAME_FOLDER = "frames/*.png"
@@ -7,20 +8,27 @@ WIDTH = 64
 HEIGHT = 32
 DURATION = 100  # milliseconds per frame
 
-frames = []
+def load_frame(path):
+    """Decode one frame file as RGBA (runs in a worker thread; PIL releases the GIL while decoding)"""
+    with Image.open(path) as img:
+        return img.convert("RGBA")
 
-# Load and sort images
-for file in sorted(glob.glob(FRAME_FOLDER)):
-    img = Image.open(file).convert("RGBA")
+# Load and sort images (decoded in parallel, processed in order)
+with ThreadPoolExecutor() as executor:
+    decoded = list(executor.map(load_frame, sorted(glob.glob(FRAME_FOLDER))))
 
+frames = [None] * len(decoded)
+for i, img in enumerate(decoded):
     # Use NEAREST for pixel art
     img = img.resize((WIDTH, HEIGHT), Image.NEAREST)
 
-    # Add black background if transparent
-    black_bg = Image.new("RGBA", img.size, (0, 0, 0))
-    final = Image.alpha_composite(black_bg, img)
+    # Add black background if transparent (pasting through the alpha
+    # channel onto black composites straight into an RGB frame)
+    final = Image.new("RGB", img.size)
+    final.paste(img, mask=img)
 
-    frames.append(final.convert("P", palette=Image.ADAPTIVE, colors=256))
+    # Fast octree palette (GIF frames are small, 256 colors is plenty)
+    frames[i] = final.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
 
 # Save GIF
 frames[0].save(
@@ -1,4 +1,5 @@
 from PIL import Image, ImageSequence
+from concurrent.futures import ThreadPoolExecutor
 import glob
 import os
 
@@ -15,10 +16,22 @@ WIDTH = 64
 HEIGHT = 32
 DURATION = 100    # milliseconds per frame (for frame conversion)
 THRESHOLD = 128   # brightness threshold
+TARGET_RATIO = WIDTH / HEIGHT
+# Threshold as a lookup table, built once (point() applies it in C)
+THRESHOLD_LUT = [255 if x > THRESHOLD else 0 for x in range(256)]
+# Black grayscale canvas reused for every GIF frame (process_frame copies out of it)
+FIT_BG = Image.new("L", (WIDTH, HEIGHT), 0)
+# Header output: hex literal for every byte value, BYTES_PER_LINE per source line
+HEX_BYTES = [f"0x{byte:02X}, " for byte in range(256)]
+BYTES_PER_LINE = 16
+
+def load_frame(path):
+    """Decode one frame file as RGBA (runs in a worker thread; PIL releases the GIL while decoding)"""
+    with Image.open(path) as img:
+        return img.convert("RGBA")
 
 def create_gif_from_frames():
     """Convert image frames (any format) to GIF"""
-    frames = []
     # Accept common image formats
     image_exts = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tiff')
     frame_files = [f for f in sorted(glob.glob(FRAME_FOLDER)) if f.lower().endswith(image_exts)]
@@ -26,13 +39,15 @@ def create_gif_from_frames():
         print(f"⚠️ No frames found in {FRAME_FOLDER}")
         return None
     print(f"📂 Found {len(frame_files)} frames:")
-    for file in frame_files:
+    # Decode all frames in parallel, then fit them in order
+    with ThreadPoolExecutor() as executor:
+        decoded = list(executor.map(load_frame, frame_files))
+    frames = [None] * len(frame_files)
+    for i, (file, img) in enumerate(zip(frame_files, decoded)):
         print(f"   - {os.path.basename(file)}")
-        img = Image.open(file).convert("RGBA")
         # Fit image into (WIDTH, HEIGHT) with aspect ratio preserved and black padding
         img_ratio = img.width / img.height
-        target_ratio = WIDTH / HEIGHT
-        if img_ratio > target_ratio:
+        if img_ratio > TARGET_RATIO:
             # Image is wider than target: fit width
             new_w = WIDTH
             new_h = round(WIDTH / img_ratio)
@@ -47,7 +62,7 @@ def create_gif_from_frames():
         paste_x = (WIDTH - new_w) // 2
         paste_y = (HEIGHT - new_h) // 2
         black_bg.paste(img_resized, (paste_x, paste_y), img_resized)
-        frames.append(black_bg.convert("P"))  # convert for GIF
+        frames[i] = black_bg.convert("P")  # convert for GIF
     # Save GIF
     frames[0].save(
         INPUT_GIF,
@@ -60,36 +75,27 @@ def create_gif_from_frames():
     return INPUT_GIF
 
 def process_frame(frame):
-    frame = frame.convert("RGBA")
+    # Grayscale + alpha straight from the palette: the output is black & white,
+    # so there's no need for an RGBA copy (alpha keeps transparent pixels black)
+    frame = frame.convert("LA")
     # FIT (aspect ratio preserved, black bars)
     img_ratio = frame.width / frame.height
-    target_ratio = WIDTH / HEIGHT
-    if img_ratio > target_ratio:
+    if img_ratio > TARGET_RATIO:
         new_w = WIDTH
         new_h = round(WIDTH / img_ratio)
     else:
         new_h = HEIGHT
         new_w = round(HEIGHT * img_ratio)
     img_fit = frame.resize((new_w, new_h), Image.LANCZOS)
-    fit_bg = Image.new("RGBA", (WIDTH, HEIGHT), (0, 0, 0, 255))
-    fit_bg.paste(img_fit, ((WIDTH - new_w) // 2, (HEIGHT - new_h) // 2), img_fit)
-    gray = fit_bg.convert("L")
-    bw = gray.point(lambda x: 255 if x > THRESHOLD else 0, mode="1")
+    FIT_BG.paste(0, (0, 0, WIDTH, HEIGHT))  # clear the previous frame
+    FIT_BG.paste(img_fit, ((WIDTH - new_w) // 2, (HEIGHT - new_h) // 2), img_fit)
+    bw = FIT_BG.point(THRESHOLD_LUT, mode="1")
     return [(bw, 'fit')]
 
 def frame_to_bytes(img):
-    pixels = img.load()
-    data = []
-
-    for y in range(HEIGHT):
-        for x in range(0, WIDTH, 8):
-            byte = 0
-            for bit in range(8):
-                if pixels[x + bit, y] == 255:
-                    byte |= (1 << (7 - bit))
-            data.append(byte)
-
-    return data
+    # Mode "1" images are stored packed 8 pixels per byte, row by row,
+    # MSB = leftmost pixel, 1 = white: already the header's bitmap layout
+    return list(img.convert("1").tobytes())
 
 # Step 1: Check if we need to create GIF from frames
 if not os.path.exists(INPUT_GIF):
@@ -108,18 +114,12 @@ print(f"🎬 Processing {INPUT_GIF}...")
 gif = Image.open(INPUT_GIF)
 
 
-frames_processed = []
-frames_bytes = []
-delays = []
-scaling_labels = []
-
-for frame in ImageSequence.Iterator(gif):
-    processed_list = process_frame(frame)
-    for processed, label in processed_list:
-        frames_processed.append(processed)
-        frames_bytes.append(frame_to_bytes(processed))
-        delays.append(2000)  # 2 seconds for each scaling
-        scaling_labels.append(label)
+# One (image, label) per scaling of every frame, then each output list built in one pass
+processed_list = [result for frame in ImageSequence.Iterator(gif) for result in process_frame(frame)]
+frames_processed = [processed for processed, _ in processed_list]
+frames_bytes = [frame_to_bytes(processed) for processed in frames_processed]
+delays = [2000] * len(processed_list)  # 2 seconds for each scaling
+scaling_labels = [label for _, label in processed_list]
 
 # ✅ Save cleaned GIF
 frames_processed[0].save(
@@ -149,12 +149,14 @@ with open(OUTPUT_HEADER, "w") as f:
     f.write(f"PROGMEM const uint8_t mygif[{frame_count}][{bytes_per_frame}] = {{\n")
 
     for idx, frame in enumerate(frames_bytes):
-        f.write("  {\n    ")
-        for i, byte in enumerate(frame):
-            f.write(f"0x{byte:02X}, ")
-            if (i + 1) % 16 == 0:
-                f.write("\n    ")
-        f.write(f"\n  }}, // {scaling_labels[idx]}\n")
+        # Build the whole frame's text, then write it once
+        lines = []
+        for start in range(0, len(frame), BYTES_PER_LINE):
+            row = frame[start:start + BYTES_PER_LINE]
+            lines.append("".join([HEX_BYTES[byte] for byte in row]))
+            if len(row) == BYTES_PER_LINE:
+                lines.append("\n    ")
+        f.write(f"  {{\n    {''.join(lines)}\n  }}, // {scaling_labels[idx]}\n")
 
     f.write("};\n\n#endif\n")
 